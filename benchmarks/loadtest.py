@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+"""
+HTTP load test for the main user journeys.
+
+Runs a weighted mix of requests (homepage, video detail, save toggle, login,
+dashboards) against a running server with N concurrent virtual users, then
+reports throughput, p50/p95/p99 latency and errors per URL name. A response
+is an error unless it is a 2xx (a 302 for the login POST), so a 404 or a
+redirect to the login page cannot pass for a fast success. Only the standard
+library is used, so it can run from any machine.
+
+    python manage.py generate_dataset --scale 1   # or create_benchmark_users
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:8000 \\
+        --concurrency 20 --duration 60 --output after.json
+    python benchmarks/loadtest.py ... --compare before.json --threshold 0.15
+
+Subjects and videos to request are discovered through /api/v1/. With
+``--compare`` the exit status is 1 when any URL name's p95 latency (or error
+rate) regressed by more than the threshold, so it can gate a deploy.
+"""
+import argparse
+import http.cookiejar
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timezone
+
+# Every request kind VirtualUser.run() knows
+KINDS = (
+    'home', 'subject_list', 'subject_detail', 'video_detail', 'toggle_save_video',
+    'login', 'student_dashboard', 'teacher_dashboard',
+)
+# URL name -> relative weight in the default mix. The subject pages have no
+# templates yet and only ever answer 500; add them with --mix once they do.
+DEFAULT_MIX = {
+    'home': 20,
+    'video_detail': 30,
+    'toggle_save_video': 5,
+    'login': 5,
+    'student_dashboard': 10,
+    'teacher_dashboard': 5,
+}
+PERCENTILES = (50, 95, 99)
+# Non-2xx statuses that are the expected answer for a kind
+EXPECTED_STATUSES = {'login': (301, 302)}
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Time each response on its own; a redirect is a successful answer
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Catalog:
+    """Subject slugs and video URLs discovered through the JSON API."""
+
+    def __init__(self, base_url, limit, subjects=True):
+        self.subjects = self._collect(base_url, '/api/v1/subjects/?fields=slug', limit) if subjects else []
+        self.videos = self._collect(base_url, '/api/v1/videos/?fields=id,slug', limit)
+        if (subjects and not self.subjects) or not self.videos:
+            raise SystemExit('No published subjects/videos found; generate a dataset first.')
+
+    @staticmethod
+    def _collect(base_url, path, limit):
+        rows, url = [], base_url + path
+        while url and len(rows) < limit:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                data = json.load(response)
+            rows += data['results']
+            url = data['next']
+        return rows[:limit]
+
+
+class VirtualUser:
+    def __init__(self, options, catalog, account, rng):
+        self.options = options
+        self.catalog = catalog
+        self.account = account
+        self.rng = rng
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect)
+        self.logged_in = False
+
+    def _csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, path, data=None, headers=None):
+        url = self.options.base_url + path
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        request = urllib.request.Request(url, data=body, headers=dict(headers or {}))
+        request.add_header('Referer', url)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.options.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            status = exc.code
+        except (urllib.error.URLError, OSError):
+            status = 0
+        return status, time.perf_counter() - start
+
+    def login(self):
+        # The login page sets the CSRF cookie the POST needs
+        self.request('/login/')
+        username, password = self.account
+        status, elapsed = self.request('/login/', {
+            'username': username, 'password': password, 'csrfmiddlewaretoken': self._csrf_token(),
+        })
+        self.logged_in = status in (301, 302)
+        return status, elapsed
+
+    def run(self, name):
+        """Perform one request of kind ``name``; returns (status, seconds)."""
+        if name == 'login':
+            return self.login()
+        if name in ('toggle_save_video', 'student_dashboard', 'teacher_dashboard') and not self.logged_in:
+            self.login()
+        if name == 'home':
+            return self.request('/')
+        if name == 'subject_list':
+            return self.request('/subjects/')
+        if name == 'subject_detail':
+            return self.request(f"/subjects/{self.rng.choice(self.catalog.subjects)['slug']}/")
+        if name == 'video_detail':
+            video = self.rng.choice(self.catalog.videos)
+            return self.request(f"/videos/{video['id']}/{video['slug'] or 'video'}/")
+        if name == 'toggle_save_video':
+            video = self.rng.choice(self.catalog.videos)
+            return self.request(
+                f"/api/toggle-save-video/{video['id']}/", {}, {'X-CSRFToken': self._csrf_token()}
+            )
+        if name == 'student_dashboard':
+            return self.request('/student/dashboard/')
+        if name == 'teacher_dashboard':
+            return self.request('/teacher/dashboard/')
+        raise ValueError(f'Unknown request kind {name!r}')
+
+
+def accounts(options):
+    students = [(options.student_username.format(n), options.password) for n in range(options.students)]
+    teachers = [(options.teacher_username.format(n), options.password) for n in range(options.teachers)]
+    return students, teachers
+
+
+def worker(index, options, catalog, mix, deadline, results, lock, start_barrier):
+    rng = random.Random(options.seed + index)
+    students, teachers = accounts(options)
+    # Every tenth virtual user is a teacher, the rest students
+    teacher = index % 10 == 9 and bool(teachers)
+    pool = teachers if teacher else students
+    user = VirtualUser(options, catalog, pool[index % len(pool)], rng)
+    # Each role only requests its own dashboard; the other one is a redirect
+    other_dashboard = 'student_dashboard' if teacher else 'teacher_dashboard'
+    names, weights = zip(*({name: weight for name, weight in mix.items() if name != other_dashboard} or mix).items())
+    local = defaultdict(list)
+    start_barrier.wait()
+    while time.monotonic() < deadline():
+        name = rng.choices(names, weights)[0]
+        status, elapsed = user.run(name)
+        local[name].append((status, elapsed, time.monotonic()))
+        if options.think_time:
+            time.sleep(rng.uniform(0, options.think_time))
+    with lock:
+        for name, samples in local.items():
+            results[name].extend(samples)
+
+
+def is_error(name, status):
+    return not (200 <= status < 300 or status in EXPECTED_STATUSES.get(name, ()))
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarise(results, measure_from, elapsed):
+    report = {}
+    for name, samples in sorted(results.items()):
+        samples = [sample for sample in samples if sample[2] >= measure_from]
+        if not samples:
+            continue
+        latencies = sorted(seconds * 1000 for _, seconds, _ in samples)
+        errors = sum(1 for status, _, _ in samples if is_error(name, status))
+        entry = {
+            'requests': len(samples),
+            'errors': errors,
+            'error_rate': errors / len(samples),
+            'throughput_rps': len(samples) / elapsed,
+            'mean_ms': sum(latencies) / len(latencies),
+            'max_ms': latencies[-1],
+        }
+        for pct in PERCENTILES:
+            entry[f'p{pct}_ms'] = percentile(latencies, pct)
+        entry['statuses'] = {
+            str(status): sum(1 for sample in samples if sample[0] == status)
+            for status in sorted({sample[0] for sample in samples})
+        }
+        report[name] = entry
+    return report
+
+
+def compare(report, baseline, threshold):
+    """Return human-readable regressions of ``report`` against ``baseline``."""
+    regressions = []
+    for name, entry in report['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        if before['p95_ms'] and entry['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f}ms -> {entry['p95_ms']:.1f}ms")
+        if entry['error_rate'] > before['error_rate'] + 0.01:
+            regressions.append(f"{name}: error rate {before['error_rate']:.2%} -> {entry['error_rate']:.2%}")
+    return regressions
+
+
+def print_table(report):
+    header = f"{'url name':<20}{'reqs':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, entry in report['endpoints'].items():
+        print(
+            f"{name:<20}{entry['requests']:>8}{entry['throughput_rps']:>9.1f}{entry['p50_ms']:>10.1f}"
+            f"{entry['p95_ms']:>10.1f}{entry['p99_ms']:>10.1f}{entry['errors']:>8}"
+        )
+    print(f"\nTotal: {report['total_requests']} requests, {report['total_rps']:.1f} req/s")
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in KINDS:
+            raise argparse.ArgumentTypeError(f'Unknown URL name {name!r}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, default=10, help='Virtual users.')
+    parser.add_argument('--duration', type=float, default=30, help='Measured seconds.')
+    parser.add_argument('--warmup', type=float, default=5, help='Seconds to run before measuring.')
+    parser.add_argument('--think-time', type=float, default=0, help='Max random pause between requests.')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='Weights, e.g. "home=5,video_detail=10". Default: the full journey mix.')
+    parser.add_argument('--catalog-size', type=int, default=500, help='Videos/subjects to sample via the API.')
+    parser.add_argument('--students', type=int, default=50)
+    parser.add_argument('--teachers', type=int, default=5)
+    parser.add_argument('--student-username', default='bench_student_{}')
+    parser.add_argument('--teacher-username', default='bench_teacher_{}')
+    parser.add_argument('--password', default='benchmark-pass')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write the JSON report here.')
+    parser.add_argument('--label', default='', help='Free text stored in the report (commit, server mode...).')
+    parser.add_argument('--compare', help='Baseline JSON report to check for regressions.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative p95 increase.')
+    options = parser.parse_args(argv)
+    options.base_url = options.base_url.rstrip('/')
+
+    catalog = Catalog(options.base_url, options.catalog_size, subjects='subject_detail' in options.mix)
+    results = defaultdict(list)
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(options.concurrency + 1)
+    timing = {}
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(index, options, catalog, options.mix, lambda: timing['deadline'], results, lock, start_barrier),
+            daemon=True,
+        )
+        for index in range(options.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    started = time.monotonic()
+    timing['deadline'] = started + options.warmup + options.duration
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+    measure_from = started + options.warmup
+    elapsed = max(time.monotonic() - measure_from, 1e-9)
+
+    endpoints = summarise(results, measure_from, elapsed)
+    total = sum(entry['requests'] for entry in endpoints.values())
+    report = {
+        'label': options.label,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'base_url': options.base_url,
+        'concurrency': options.concurrency,
+        'duration_s': elapsed,
+        'mix': options.mix,
+        'total_requests': total,
+        'total_rps': total / elapsed,
+        'endpoints': endpoints,
+    }
+    print_table(report)
+    if options.output:
+        with open(options.output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+
+    if options.compare:
+        with open(options.compare) as fh:
+            regressions = compare(report, json.load(fh), options.threshold)
+        if regressions:
+            print('\nRegressions:\n  ' + '\n  '.join(regressions))
+            return 1
+        print('\nNo regressions against the baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
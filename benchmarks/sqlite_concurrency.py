@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""
+Concurrent read/write throughput of the default and the tuned SQLite setup.
+
+Seeds a scratch database, then for each mode runs --writers and --readers
+processes (standing in for gunicorn workers) against a fresh copy of it for
+--duration seconds. Writers record a view the way a request does: read the
+video, insert a VideoView and bump its view count inside atomic(). Readers
+run the video detail queries. Each operation ends like a request, with
+close_old_connections(), so CONN_MAX_AGE applies.
+
+    python benchmarks/sqlite_concurrency.py --writers 4 --readers 8 --duration 10
+    python benchmarks/sqlite_concurrency.py --modes tuned --output tuned.json
+
+'default' is the plain sqlite3 backend; 'tuned' sets SQLITE_TUNED=True (see
+education/db_backends/sqlite3). Failed operations, almost always
+"database is locked", are counted as errors.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {
+    'default': {'SQLITE_TUNED': 'False'},
+    'tuned': {'SQLITE_TUNED': 'True'},
+}
+PERCENTILES = (50, 95, 99)
+
+
+def setup_django(path, env):
+    os.environ.update(env, SQLITE_PATH=path, DJANGO_SETTINGS_MODULE='edtech_project.settings')
+    # Write views synchronously; the benchmark measures the database, not the queue
+    os.environ['VIEW_EVENTS_ASYNC'] = 'False'
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    import django
+    django.setup()
+
+
+def seed(path, videos):
+    """Create a migrated database with one teacher, a few subjects and ``videos`` published videos."""
+    setup_django(path, MODES['default'])
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connections
+    from education.models import Subject, VideoContent
+
+    call_command('migrate', verbosity=0)
+    teacher = User.objects.create_user('bench-teacher')
+    subjects = [Subject.objects.create(name=f'Bench {index}', slug=f'bench-{index}') for index in range(5)]
+    VideoContent.objects.bulk_create([
+        VideoContent(
+            title=f'Video {index}', slug=f'video-{index}', video_file='bench.mp4', teacher=teacher,
+            subject=subjects[index % len(subjects)], is_published=True,
+        )
+        for index in range(videos)
+    ])
+    ids = list(VideoContent.objects.values_list('id', flat=True))
+    connections.close_all()
+    return ids
+
+
+def write_once(video_id, rng):
+    from django.db import transaction
+    from django.db.models import F
+    from education.models import VideoContent, VideoView
+
+    with transaction.atomic():
+        video = VideoContent.objects.only('id').get(pk=video_id)
+        VideoView.objects.create(video=video, session_key=f'{rng.getrandbits(64):x}', ip_address='127.0.0.1')
+        VideoContent.objects.filter(pk=video_id).update(view_count=F('view_count') + 1)
+
+
+def read_once(video_id, rng):
+    from education.models import VideoContent, VideoView
+
+    video = VideoContent.objects.select_related('teacher', 'subject').get(pk=video_id)
+    list(VideoContent.objects.filter(subject_id=video.subject_id, is_published=True).exclude(pk=video_id)[:6])
+    VideoView.objects.filter(video_id=video_id).count()
+
+
+def worker(role, path, env, ids, duration, barrier, results):
+    setup_django(path, env)
+    from django.db import DatabaseError, close_old_connections
+
+    operation = write_once if role == 'writer' else read_once
+    rng = random.Random(os.getpid())
+    latencies, errors = [], 0
+    barrier.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            operation(rng.choice(ids), rng)
+        except DatabaseError:
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - start)
+        close_old_connections()
+    results.put((role, latencies, errors))
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def run_mode(mode, template, ids, options):
+    directory = tempfile.mkdtemp(prefix=f'sqlite-bench-{mode}-')
+    path = os.path.join(directory, 'db.sqlite3')
+    shutil.copy(template, path)
+    context = multiprocessing.get_context('spawn')
+    roles = ['writer'] * options.writers + ['reader'] * options.readers
+    barrier, results = context.Barrier(len(roles)), context.Queue()
+    processes = [
+        context.Process(target=worker, args=(role, path, MODES[mode], ids, options.duration, barrier, results))
+        for role in roles
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    shutil.rmtree(directory, ignore_errors=True)
+
+    report = {}
+    for role in ('writer', 'reader'):
+        latencies = sorted(latency for kind, samples, _ in collected if kind == role for latency in samples)
+        entry = {
+            'operations': len(latencies),
+            'per_second': len(latencies) / options.duration,
+            'errors': sum(failed for kind, _, failed in collected if kind == role),
+        }
+        for pct in PERCENTILES:
+            value = percentile(latencies, pct)
+            entry[f'p{pct}_ms'] = value * 1000 if value is not None else None
+        report[role + 's'] = entry
+    return report
+
+
+def print_table(reports):
+    header = f"{'mode':<10}{'role':<9}{'ops':>9}{'ops/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+    print(header)
+    print('-' * len(header))
+    for mode, report in reports.items():
+        for role, entry in report.items():
+            cells = [entry[f'p{pct}_ms'] for pct in PERCENTILES]
+            cells = ''.join(f'{value:>9.1f}' if value is not None else f"{'-':>9}" for value in cells)
+            print(f"{mode:<10}{role:<9}{entry['operations']:>9}{entry['per_second']:>10.1f}{cells}{entry['errors']:>8}")
+    if {'default', 'tuned'} <= set(reports):
+        for role in ('writers', 'readers'):
+            before, after = reports['default'][role]['per_second'], reports['tuned'][role]['per_second']
+            if before:
+                print(f'\n{role}: {after / before:.2f}x throughput with the tuned setup', end='')
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4, help='Writing processes.')
+    parser.add_argument('--readers', type=int, default=8, help='Reading processes.')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per mode.')
+    parser.add_argument('--videos', type=int, default=200, help='Videos in the seeded database.')
+    parser.add_argument('--modes', default='default,tuned', help='Comma-separated, from: ' + ', '.join(MODES))
+    parser.add_argument('--output', help='Write the report as JSON to this file.')
+    options = parser.parse_args(argv)
+    modes = [mode.strip() for mode in options.modes.split(',') if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(sorted(unknown))}")
+
+    directory = tempfile.mkdtemp(prefix='sqlite-bench-')
+    try:
+        template = os.path.join(directory, 'template.sqlite3')
+        print('Seeding a scratch database...', file=sys.stderr)
+        ids = seed(template, options.videos)
+        reports = {}
+        for mode in modes:
+            print(f'Running {mode} ({options.writers} writers, {options.readers} readers, '
+                  f'{options.duration:g}s)...', file=sys.stderr)
+            reports[mode] = run_mode(mode, template, ids, options)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print_table(reports)
+    if options.output:
+        with open(options.output, 'w') as handle:
+            json.dump({'options': vars(options), 'modes': reports}, handle, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
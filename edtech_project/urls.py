@@ -19,7 +19,15 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from education import metrics, profiling_views
+
 urlpatterns = [
+    # Request profiles (education/profiling.py), browsable by staff next to the admin
+    path('admin/profiles/', admin.site.admin_view(profiling_views.profile_list), name='profile_list'),
+    path('admin/profiles/<str:profile_id>/', admin.site.admin_view(profiling_views.profile_detail), name='profile_detail'),
+    path('admin/profiles/<str:profile_id>/download/', admin.site.admin_view(profiling_views.profile_download),
+         name='profile_download'),
     path('admin/', admin.site.urls),
+    path('metrics', metrics.metrics_view, name='metrics'),
     path('', include('education.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
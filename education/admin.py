@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Subject, VideoContent, Note, UserProfile, VideoView
+from .models import Subject, VideoContent, Note, UserProfile, VideoView, ProcessingWatermark
 
 # Unregister the default User admin
 admin.site.unregister(User)
@@ -40,8 +40,8 @@ class SubjectAdmin(admin.ModelAdmin):
 
 @admin.register(VideoContent)
 class VideoContentAdmin(admin.ModelAdmin):
-    list_display = ('title', 'teacher', 'subject', 'is_published', 'view_count', 'created_at')
-    list_filter = ('is_published', 'subject', 'difficulty', 'created_at')
+    list_display = ('title', 'teacher', 'subject', 'is_published', 'view_count', 'processing_status', 'created_at')
+    list_filter = ('is_published', 'subject', 'difficulty', 'processing_status', 'created_at')
     search_fields = ('title', 'description', 'teacher__username')
     list_editable = ('is_published',)
     prepopulated_fields = {'slug': ('title',)}
@@ -59,4 +59,9 @@ class VideoViewAdmin(admin.ModelAdmin):
     list_display = ('video', 'user', 'ip_address', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('video__title', 'user__username', 'ip_address')
-    raw_id_fields = ('video', 'user')
\ No newline at end of file
+    raw_id_fields = ('video', 'user')
+
+@admin.register(ProcessingWatermark)
+class ProcessingWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('name', 'last_id', 'updated_at')
+    readonly_fields = ('updated_at',)
@@ -0,0 +1,281 @@
+"""
+Read-only JSON catalog API (v1) for subjects, videos, teachers and notes.
+
+Rows are serialised straight from ``.values()`` so no model instances are
+built. Every response carries a strong ETag computed from a cheap watermark
+aggregate (latest updated_at, highest id, row count, ...) over the same
+filtered queryset, plus the request parameters; a matching If-None-Match gets
+a 304 without the listing query ever running. Fields read through a join (a
+video's subject slug or teacher username) add the joined rows' latest
+updated_at to the watermark. User names count through the profile's
+updated_at, which models.py bumps whenever a user is saved. ``?fields=a,b``
+limits the fields returned, and lists are paginated with the keyset cursors
+from pagination.py (``next``/``previous`` links).
+"""
+import hashlib
+
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max, Sum
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+
+from .models import Note, Subject, UserProfile, VideoContent
+from .pagination import CURSOR_PARAM, VIDEO_SORTS, KeysetPaginator
+
+API_VERSION = 'v1'
+PAGE_SIZE = 20
+
+
+class Resource:
+    """Describes how one model is exposed: public fields, filters, ordering and watermark."""
+    name = None
+    # Public field name -> ORM path passed to values()
+    fields = {}
+    default_fields = None
+    # Fields holding a storage name that is returned as a URL
+    file_fields = ()
+    lookup = 'pk'
+    ordering = ('-id',)
+    sorts = None
+    watermark = {'updated': Max('updated_at'), 'last_id': Max('id'), 'count': Count('id')}
+
+    def get_queryset(self, request):
+        raise NotImplementedError
+
+    def filter_list(self, request, queryset):
+        return queryset
+
+    def get_ordering(self, request):
+        if self.sorts:
+            return self.sorts.get(request.GET.get('sort'), next(iter(self.sorts.values())))
+        return self.ordering
+
+    def serialize(self, row, selected):
+        data = {field: row[self.fields[field]] for field in selected}
+        for field in self.file_fields:
+            if field in data:
+                data[field] = default_storage.url(data[field]) if data[field] else None
+        return data
+
+
+class SubjectResource(Resource):
+    name = 'subjects'
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'slug': 'slug',
+        'description': 'description',
+        'thumbnail': 'thumbnail',
+        'video_count': 'published_video_count',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    default_fields = ('id', 'name', 'slug', 'video_count')
+    file_fields = ('thumbnail',)
+    lookup = 'slug'
+    ordering = ('name', 'id')
+    # The counter is maintained with update(), which does not touch updated_at
+    watermark = dict(Resource.watermark, videos=Sum('published_video_count'))
+
+    def get_queryset(self, request):
+        return Subject.objects.all()
+
+
+class VideoResource(Resource):
+    name = 'videos'
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+        'thumbnail': 'thumbnail',
+        'duration': 'duration',
+        'difficulty': 'difficulty',
+        'is_free': 'is_free',
+        'price': 'price',
+        'view_count': 'view_count',
+        'subject': 'subject__slug',
+        'teacher': 'teacher__username',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    default_fields = ('id', 'title', 'slug', 'thumbnail', 'duration', 'subject', 'teacher', 'view_count', 'created_at')
+    file_fields = ('thumbnail',)
+    sorts = VIDEO_SORTS
+    # Flushed view counts are written with update() too
+    watermark = dict(
+        Resource.watermark, views=Sum('view_count'),
+        subject_updated=Max('subject__updated_at'), teacher_updated=Max('teacher__profile__updated_at'),
+    )
+
+    def get_queryset(self, request):
+        return VideoContent.objects.filter(is_published=True)
+
+    def filter_list(self, request, queryset):
+        if request.GET.get('subject'):
+            queryset = queryset.filter(subject__slug=request.GET['subject'])
+        if request.GET.get('teacher'):
+            queryset = queryset.filter(teacher__username=request.GET['teacher'])
+        return queryset
+
+
+class TeacherResource(Resource):
+    name = 'teachers'
+    fields = {
+        'id': 'id',
+        'username': 'user__username',
+        'first_name': 'user__first_name',
+        'last_name': 'user__last_name',
+        'bio': 'bio',
+        'profile_picture': 'profile_picture',
+        'qualification': 'qualification',
+        'experience': 'experience',
+        'video_count': 'published_video_count',
+        'website': 'website',
+        'updated_at': 'updated_at',
+    }
+    default_fields = ('id', 'username', 'first_name', 'last_name', 'profile_picture', 'video_count')
+    file_fields = ('profile_picture',)
+    lookup = 'user__username'
+    ordering = ('-published_video_count', '-id')
+    watermark = dict(Resource.watermark, videos=Sum('published_video_count'))
+
+    def get_queryset(self, request):
+        return UserProfile.objects.filter(role='teacher', is_approved=True)
+
+
+class NoteResource(Resource):
+    name = 'notes'
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'content': 'content',
+        'note_type': 'note_type',
+        'file': 'file',
+        'video': 'video_id',
+        'subject': 'subject__slug',
+        'teacher': 'teacher__username',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    default_fields = ('id', 'title', 'note_type', 'file', 'video', 'subject', 'teacher', 'created_at')
+    file_fields = ('file',)
+    watermark = dict(
+        Resource.watermark,
+        subject_updated=Max('subject__updated_at'), teacher_updated=Max('teacher__profile__updated_at'),
+    )
+
+    def get_queryset(self, request):
+        return Note.objects.filter(is_public=True)
+
+    def filter_list(self, request, queryset):
+        if request.GET.get('subject'):
+            queryset = queryset.filter(subject__slug=request.GET['subject'])
+        if request.GET.get('video', '').isdigit():
+            queryset = queryset.filter(video_id=request.GET['video'])
+        if request.GET.get('teacher'):
+            queryset = queryset.filter(teacher__username=request.GET['teacher'])
+        return queryset
+
+
+RESOURCES = {resource.name: resource for resource in (
+    SubjectResource(), VideoResource(), TeacherResource(), NoteResource(),
+)}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _selected_fields(request, resource):
+    if not request.GET.get('fields'):
+        return list(resource.default_fields or resource.fields)
+    selected = [field.strip() for field in request.GET['fields'].split(',') if field.strip()]
+    unknown = [field for field in selected if field not in resource.fields]
+    if unknown:
+        raise BadRequest(f"Unknown field(s): {', '.join(unknown)}")
+    return selected
+
+
+def _list_queryset(request, resource):
+    return resource.filter_list(request, resource.get_queryset(request))
+
+
+def _detail_queryset(request, resource, key):
+    return resource.get_queryset(request).filter(**{resource.lookup: key})
+
+
+def _etag(resource, request, watermark):
+    # Strong ETag: identical watermark and parameters mean an identical body
+    parts = [API_VERSION, resource.name, request.get_full_path(), repr(sorted(watermark.items()))]
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+def list_etag(request, resource):
+    watermark = _list_queryset(request, RESOURCES[resource]).order_by().aggregate(**RESOURCES[resource].watermark)
+    return _etag(RESOURCES[resource], request, watermark)
+
+
+def detail_etag(request, resource, key):
+    watermark = _detail_queryset(request, RESOURCES[resource], key).order_by().aggregate(**RESOURCES[resource].watermark)
+    if not watermark['count']:
+        return None
+    return _etag(RESOURCES[resource], request, watermark)
+
+
+def _page_url(request, cursor):
+    if not cursor:
+        return None
+    query = request.GET.copy()
+    query[CURSOR_PARAM] = cursor
+    return request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+
+
+@require_safe
+@cache_control(no_cache=True)
+@condition(etag_func=list_etag)
+def resource_list(request, resource):
+    resource = RESOURCES[resource]
+    try:
+        selected = _selected_fields(request, resource)
+    except BadRequest as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    ordering = resource.get_ordering(request)
+    # The keyset cursor needs the ordering columns even when they were not asked for
+    paths = {resource.fields[field] for field in selected}
+    paths.update(name.lstrip('-') for name in ordering)
+    paths.add('id')
+    queryset = _list_queryset(request, resource).values(*paths)
+    page = KeysetPaginator(queryset, PAGE_SIZE, ordering).get_page(request.GET.get(CURSOR_PARAM))
+
+    return JsonResponse({
+        'results': [resource.serialize(row, selected) for row in page],
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+    })
+
+
+@require_safe
+@cache_control(no_cache=True)
+@condition(etag_func=detail_etag)
+def resource_detail(request, resource, key):
+    resource = RESOURCES[resource]
+    try:
+        selected = _selected_fields(request, resource)
+    except BadRequest as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    row = _detail_queryset(request, resource, key).values(*{resource.fields[field] for field in selected}).first()
+    if row is None:
+        raise Http404(f"No {resource.name} entry matches the given query.")
+    return JsonResponse(resource.serialize(row, selected))
+
+
+def api_root(request):
+    return JsonResponse({
+        name: request.build_absolute_uri(reverse(f'api_{name}'))
+        for name in RESOURCES
+    })
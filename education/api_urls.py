@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import api
+
+urlpatterns = [
+    path('', api.api_root, name='api_root'),
+]
+
+for name, resource in api.RESOURCES.items():
+    key = '<int:key>' if resource.lookup == 'pk' else '<str:key>'
+    urlpatterns += [
+        path(f'{name}/', api.resource_list, {'resource': name}, name=f'api_{name}'),
+        path(f'{name}/{key}/', api.resource_detail, {'resource': name}, name=f'api_{name}_detail'),
+    ]
@@ -0,0 +1,155 @@
+"""
+Async versions of the hot read paths, used when SERVER_MODE=asgi (uvicorn
+workers under gunicorn, see start.sh).
+
+Simple lookups use the async ORM API. Django 4.2 runs every async ORM call of
+a request on the same thread, so independent multi-query work goes through
+``blocking()`` instead, which gives each call its own worker thread and
+database connection and lets ``asyncio.gather()`` overlap them. Nothing that
+can block (ORM, cache backends, template rendering) runs on the event loop
+itself.
+
+The auth/HTTP method decorators in Django 4.2 are not async-aware, so those
+checks are done inline.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from django.db.models import Q
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+from django.shortcuts import render
+
+from . import homepage_cache, saved_sets, view_counter, view_events
+from .models import Subject, VideoContent
+from .pagination import paginate, video_sort
+from .related_videos import related_videos_for
+
+
+async def blocking(fn, *args, **kwargs):
+    """Run blocking ``fn`` on its own worker thread, releasing its DB connection like a request would."""
+    def call():
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return await sync_to_async(call, thread_sensitive=False)()
+
+
+async def _resolve_user(request):
+    # request.user is lazy and loads the session/user synchronously
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+def _client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR')
+
+
+async def _render(request, template_name, context):
+    # Context processors and templates may still touch the ORM
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def homepage(request):
+    # One worker thread reads the shared version and the cached entry (the
+    # cache backends' a* methods are sync_to_async wrappers in Django 4.2, so
+    # they would leave the event loop anyway); misses and stale entries take
+    # the stampede-protected path on that same thread
+    context = await blocking(homepage_cache.get_homepage_data)
+    return await _render(request, 'education/homepage.html', context)
+
+
+def _track_view(video, user, session_key, ip_address):
+    pending = None
+    if user.is_authenticated:
+        view_events.record(video.id, user.id, ip_address=ip_address)
+        # Buffered; the count is written to the database in batches
+        pending = view_counter.record_view(video.id)
+    else:
+        view_events.record(video.id, session_key=session_key or '', ip_address=ip_address)
+    return view_counter.live_view_count(video, pending)
+
+
+async def video_detail(request, pk, slug=None):
+    user = await _resolve_user(request)
+
+    # Only show published videos to non-owners
+    queryset = VideoContent.objects.select_related('teacher', 'subject')
+    if user.is_authenticated:
+        queryset = queryset.filter(Q(is_published=True) | Q(teacher=user))
+    else:
+        queryset = queryset.filter(is_published=True)
+    try:
+        video = await queryset.aget(pk=pk)
+    except VideoContent.DoesNotExist:
+        raise Http404('No video found matching the query')
+
+    view_count, related_videos, notes = await asyncio.gather(
+        blocking(_track_view, video, user, request.session.session_key, _client_ip(request)),
+        blocking(related_videos_for, video, 4),
+        _alist(video.video_notes.filter(is_public=True)),
+    )
+    video.view_count = view_count
+    # Cache reads only, see saved_sets.py
+    saved_video_ids = await blocking(
+        saved_sets.saved_among, user, [video.id] + [related.id for related in related_videos]
+    )
+
+    return await _render(request, 'education/video_detail.html', {
+        'object': video,
+        'video': video,
+        'related_videos': related_videos,
+        'notes': notes,
+        'is_saved': video.id in saved_video_ids,
+        'saved_video_ids': saved_video_ids,
+    })
+
+
+async def subject_detail(request, slug):
+    try:
+        subject = await Subject.objects.aget(slug=slug)
+    except Subject.DoesNotExist:
+        raise Http404('No subject found matching the query')
+
+    sort, ordering = video_sort(request)
+    videos, related_subjects = await asyncio.gather(
+        blocking(paginate, request, subject.videos.filter(is_published=True).select_related('teacher'), 12, ordering),
+        _alist(Subject.objects.filter(
+            published_video_count__gt=0
+        ).exclude(id=subject.id).order_by('-published_video_count')[:4]),
+    )
+    user = await _resolve_user(request)
+    saved_video_ids = await blocking(saved_sets.saved_among, user, [video.id for video in videos])
+
+    return await _render(request, 'education/subject_detail.html', {
+        'object': subject,
+        'subject': subject,
+        'videos': videos,
+        'sort': sort,
+        'saved_video_ids': saved_video_ids,
+        'related_subjects': related_subjects,
+        'page_title': f"{subject.name} - Videos",
+    })
+
+
+async def toggle_save_video(request, video_id):
+    user = await _resolve_user(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    # A DELETE, plus an INSERT when nothing was deleted; see saved_sets.py
+    saved = await blocking(saved_sets.toggle_video, user, video_id, saved_sets.requested_state(request))
+    if saved is None:
+        raise Http404('No video found matching the query')
+    return JsonResponse({'saved': saved})
@@ -9,15 +9,12 @@ def signup_view(request):
     if request.method == 'POST':
         form = UserRegistrationForm(request.POST)
         if form.is_valid():
-            user = form.save(commit=False)
-            # Set the user as a teacher (assuming your form has an is_teacher field)
-            if hasattr(form, 'cleaned_data') and 'is_teacher' in form.cleaned_data:
-                user.is_teacher = form.cleaned_data['is_teacher']
-            user.save()
+            # Creates the user and their profile (with the chosen role) in one transaction
+            user = form.save()
             login(request, user)
             messages.success(request, 'Registration successful!')
             # Redirect to teacher dashboard if user is a teacher
-            if hasattr(user, 'is_teacher') and user.is_teacher:
+            if user.profile.is_teacher:
                 return redirect('teacher_dashboard')
             return redirect('home')
     else:
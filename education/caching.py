@@ -0,0 +1,64 @@
+"""
+Cached query results with stampede protection.
+
+Values are stored together with a soft expiry. Once that passes, one worker
+(whoever wins a cache.add() lock) recomputes while the others keep serving
+the stale copy until the hard timeout. On a cold miss the losers wait briefly
+for the winner instead of all hitting the database at once.
+"""
+import time
+
+from django.core.cache import cache
+
+from .metrics import record_cache
+
+STALE_GRACE = 60
+LOCK_TIMEOUT = 30
+WAIT_STEP = 0.05
+WAIT_LIMIT = 2.0
+
+
+def _name(key):
+    # Metrics label: 'homepage:data' -> 'homepage'
+    return key.split(':', 1)[0]
+
+
+def _lock_key(key):
+    return f"{key}:lock"
+
+
+def get_or_compute(key, compute, timeout):
+    """Return the cached value for ``key``, calling ``compute()`` at most once across workers."""
+    cached = cache.get(key)
+    record_cache(_name(key), cached is not None)
+    if cached is not None:
+        value, soft_expires = cached
+        if time.time() < soft_expires or not cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+            return value
+        return _recompute(key, compute, timeout)
+
+    if cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+        return _recompute(key, compute, timeout)
+
+    # Someone else is computing it; give them a moment before doing it ourselves
+    waited = 0.0
+    while waited < WAIT_LIMIT:
+        time.sleep(WAIT_STEP)
+        waited += WAIT_STEP
+        cached = cache.get(key)
+        if cached is not None:
+            return cached[0]
+    return compute()
+
+
+def _recompute(key, compute, timeout):
+    try:
+        value = compute()
+        cache.set(key, (value, time.time() + timeout), timeout + STALE_GRACE)
+        return value
+    finally:
+        cache.delete(_lock_key(key))
+
+
+def invalidate(key):
+    cache.delete(key)
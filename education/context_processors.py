@@ -1,9 +1,9 @@
+from .profiles import get_profile
+
+
 def user_profile(request):
     """
     Adds the user's profile to the template context if the user is authenticated.
     """
-    if hasattr(request, 'user') and request.user.is_authenticated:
-        return {
-            'user_profile': getattr(request.user, 'profile', None)
-        }
-    return {'user_profile': None}
+    # Shares the request-scoped profile with the views, see profiles.py
+    return {'user_profile': get_profile(request)}
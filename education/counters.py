@@ -0,0 +1,68 @@
+"""
+Denormalized published-video counters.
+
+Subject.published_video_count and UserProfile.published_video_count (for the
+teacher) are adjusted with F() updates whenever a video is created, published,
+unpublished, moved to another subject, handed to another teacher or deleted.
+Bulk QuerySet.update() calls bypass the signals, so ``reconcile()`` (exposed as
+``manage.py reconcile_video_counts``) recomputes everything from scratch.
+"""
+from collections import Counter
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def counter_state(video):
+    return (video.is_published, video.subject_id, video.teacher_id)
+
+
+def _apply(subject_deltas, teacher_deltas):
+    from .models import Subject, UserProfile
+
+    for subject_id, delta in subject_deltas.items():
+        if subject_id is not None and delta:
+            Subject.objects.filter(id=subject_id).update(published_video_count=F('published_video_count') + delta)
+    for teacher_id, delta in teacher_deltas.items():
+        if teacher_id is not None and delta:
+            UserProfile.objects.filter(user_id=teacher_id).update(published_video_count=F('published_video_count') + delta)
+
+
+def video_changed(old_state, new_state):
+    """Move the counts from ``old_state`` to ``new_state`` (either may be None)."""
+    subject_deltas = Counter()
+    teacher_deltas = Counter()
+    for state, delta in ((old_state, -1), (new_state, 1)):
+        if state is None:
+            continue
+        is_published, subject_id, teacher_id = state
+        if is_published:
+            subject_deltas[subject_id] += delta
+            teacher_deltas[teacher_id] += delta
+    _apply(subject_deltas, teacher_deltas)
+
+
+def _published_count(field, outer_field):
+    from .models import VideoContent
+
+    counts = VideoContent.objects.filter(
+        is_published=True, **{field: OuterRef(outer_field)}
+    ).order_by().values(field).annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def reconcile():
+    """Repair drifted counters in bulk. Returns ``(subjects_fixed, profiles_fixed)``."""
+    from .models import Subject, UserProfile
+
+    results = []
+    for model, field, outer_field in ((Subject, 'subject', 'pk'), (UserProfile, 'teacher', 'user_id')):
+        drifted = model.objects.annotate(
+            actual=_published_count(field, outer_field)
+        ).exclude(published_video_count=F('actual'))
+        results.append(
+            model.objects.filter(pk__in=drifted.values('pk')).update(
+                published_video_count=_published_count(field, outer_field)
+            )
+        )
+    return tuple(results)
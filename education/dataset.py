@@ -0,0 +1,291 @@
+"""
+Synthetic dataset generator behind ``manage.py generate_dataset``.
+
+Fills every model at a configurable scale so performance work can be done
+against realistic volumes: Zipf-skewed video popularity, a long tail of
+light viewers, anonymous sessions, saved videos and enrolled subjects. Rows
+are written with chunked bulk_create() inside per-chunk transactions, with
+model signals muted and timestamps spread over the months before ``now``.
+Output only depends on ``seed``, ``scale`` and ``now``, which defaults to the
+fixed EPOCH; pass the current time to get "recent" activity for the
+dashboards, at the cost of a different dataset on every run.
+
+Accounts use the bench_student_N / bench_teacher_N names and the shared
+password from create_benchmark_users, so benchmarks/loadtest.py can log in.
+"""
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, signals
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from . import counters, rollups
+from .management.commands.create_benchmark_users import DEFAULT_PASSWORD, STUDENT_USERNAME, TEACHER_USERNAME
+from .models import Note, Subject, UserProfile, VideoContent, VideoView
+
+CHUNK_SIZE = 5000
+SYNTHETIC_VIDEO_DIR = 'videos/synthetic/'
+HISTORY_DAYS = 180
+# Default end of the generated history, so timestamps are reproducible too
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+# Row counts at scale 1.0
+BASE_COUNTS = {
+    'subjects': 40,
+    'teachers': 400,
+    'videos': 5000,
+    'students': 20000,
+    'views': 400000,
+    'notes': 3000,
+}
+SAVED_PER_STUDENT = 4
+SUBJECTS_PER_STUDENT = 3
+ANONYMOUS_VIEW_SHARE = 0.2
+# Exponent of the Zipf-like popularity curve
+POPULARITY_SKEW = 1.1
+
+WORDS = (
+    'algebra geometry calculus statistics probability physics chemistry biology history geography '
+    'literature grammar writing reading python programming algorithms data structures networks '
+    'economics finance accounting marketing psychology sociology philosophy ethics logic music '
+    'art design drawing painting photography astronomy ecology genetics anatomy nutrition '
+    'spanish french german chinese japanese introduction advanced basics practice review exam '
+    'tutorial lecture workshop seminar project lab theory applications fundamentals masterclass '
+    'equations functions vectors matrices derivatives integrals limits series proofs sets graphs '
+    'cells atoms molecules energy forces motion waves light electricity magnetism evolution climate'
+).split()
+
+MUTED_SIGNALS = (signals.pre_save, signals.post_save, signals.pre_delete, signals.post_delete, signals.m2m_changed)
+
+
+@contextmanager
+def signals_muted():
+    """Detach every model signal receiver for the duration of the block."""
+    saved = [(signal, signal.receivers) for signal in MUTED_SIGNALS]
+    try:
+        for signal in MUTED_SIGNALS:
+            signal.receivers = []
+            signal.sender_receivers_cache.clear()
+        yield
+    finally:
+        for signal, receivers in saved:
+            signal.receivers = receivers
+            signal.sender_receivers_cache.clear()
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create() keep the created_at/updated_at values we generate."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    try:
+        for field in fields:
+            field.auto_now = field.auto_now_add = False
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class DatasetGenerator:
+    def __init__(self, scale=1.0, seed=0, now=EPOCH, log=print):
+        self.rng = random.Random(seed)
+        self.counts = {name: max(int(count * scale), 1) for name, count in BASE_COUNTS.items()}
+        self.log = log
+        self.now = now.replace(microsecond=0)
+
+    def words(self, count):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(count))
+
+    def past(self, days=HISTORY_DAYS, after=None):
+        start = after or self.now - timedelta(days=days)
+        span = max((self.now - start).total_seconds(), 1)
+        return start + timedelta(seconds=self.rng.random() * span)
+
+    def bulk(self, model, objects):
+        """bulk_create ``objects`` (any iterable) in chunks, one transaction per chunk."""
+        created, chunk = 0, []
+        for obj in objects:
+            chunk.append(obj)
+            if len(chunk) >= CHUNK_SIZE:
+                created += self._write(model, chunk)
+                chunk = []
+        if chunk:
+            created += self._write(model, chunk)
+        self.log(f'  {model._meta.label}: {created} row(s)')
+        return created
+
+    @staticmethod
+    def _write(model, chunk):
+        with transaction.atomic():
+            model.objects.bulk_create(chunk, batch_size=CHUNK_SIZE)
+        return len(chunk)
+
+    def run(self):
+        with signals_muted(), explicit_timestamps(Subject, VideoContent, VideoView, Note, UserProfile):
+            self.create_subjects()
+            self.create_users()
+            self.create_videos()
+            self.create_notes()
+            self.create_memberships()
+            self.create_views()
+        # Denormalised counters were not maintained by the muted receivers
+        counters.reconcile()
+        self.log(f'  view rollups: {rollups.build_rollups(full=True)} day(s)')
+        return self.counts
+
+    def create_subjects(self):
+        names = set()
+        while len(names) < self.counts['subjects']:
+            names.add(f"{self.rng.choice(WORDS)} {self.rng.choice(WORDS)} {len(names) + 1}".title())
+        self.bulk(Subject, (
+            Subject(name=name, slug=slugify(name), description=self.words(30), created_at=self.past(), updated_at=self.now)
+            for name in sorted(names)
+        ))
+        self.subject_ids = list(Subject.objects.order_by('id').values_list('id', flat=True))
+
+    def create_users(self):
+        # Hashing is deliberately slow, so every account shares one hash. A salt
+        # drawn from the seeded generator keeps the hash reproducible as well.
+        password = make_password(DEFAULT_PASSWORD, salt='%022x' % self.rng.getrandbits(88))
+        accounts = [(TEACHER_USERNAME.format(n), 'teacher') for n in range(self.counts['teachers'])]
+        accounts += [(STUDENT_USERNAME.format(n), 'student') for n in range(self.counts['students'])]
+
+        def users():
+            for username, role in accounts:
+                joined = self.past()
+                yield User(
+                    username=username, email=f'{username}@example.com', password=password,
+                    first_name=self.rng.choice(WORDS).title(), last_name=self.rng.choice(WORDS).title(),
+                    date_joined=joined,
+                    # Most students were active recently, a tail has drifted away
+                    last_login=self.past(after=joined) if self.rng.random() < 0.8 else None,
+                )
+
+        self.bulk(User, users())
+        ids = dict(User.objects.filter(username__startswith='bench_').values_list('username', 'id'))
+        self.teacher_ids = [ids[name] for name, role in accounts if role == 'teacher']
+        self.student_ids = [ids[name] for name, role in accounts if role == 'student']
+
+        def profiles():
+            for username, role in accounts:
+                yield UserProfile(
+                    user_id=ids[username], role=role, bio=self.words(20) if role == 'teacher' else '',
+                    qualification=self.words(3).title() if role == 'teacher' else '',
+                    experience=self.rng.randint(0, 30) if role == 'teacher' else 0,
+                    is_approved=role == 'teacher' and self.rng.random() < 0.9,
+                    grade=str(self.rng.randint(6, 12)) if role == 'student' else '',
+                    created_at=self.now, updated_at=self.now,
+                )
+
+        self.bulk(UserProfile, profiles())
+        self.profile_ids = dict(UserProfile.objects.filter(user_id__in=self.student_ids).values_list('user_id', 'id'))
+
+    def create_videos(self):
+        def videos():
+            for n in range(self.counts['videos']):
+                title = self.words(self.rng.randint(3, 7)).capitalize()
+                created = self.past()
+                yield VideoContent(
+                    title=title, slug=f'{slugify(title)}-{n + 1}', description=self.words(60),
+                    video_file=f'{SYNTHETIC_VIDEO_DIR}{n + 1}.mp4',
+                    duration=self.rng.randint(120, 3600),
+                    teacher_id=self.rng.choice(self.teacher_ids),
+                    subject_id=self.rng.choice(self.subject_ids),
+                    difficulty=self.rng.choice(('beginner', 'intermediate', 'advanced')),
+                    is_published=self.rng.random() < 0.9,
+                    # There is no media to package for synthetic rows
+                    processing_status='failed',
+                    created_at=created, updated_at=created,
+                )
+
+        self.bulk(VideoContent, videos())
+        rows = list(VideoContent.objects.filter(is_published=True).order_by('id').values_list('id', 'created_at'))
+        # Shuffle once so popularity is unrelated to id order, then weight by rank
+        self.rng.shuffle(rows)
+        self.videos = rows
+        self.popularity = list(accumulate(1.0 / (rank + 1) ** POPULARITY_SKEW for rank in range(len(rows))))
+
+    def create_notes(self):
+        def notes():
+            for _ in range(self.counts['notes']):
+                video_id, created = self.rng.choice(self.videos)
+                yield Note(
+                    title=self.words(4).capitalize(), content=self.words(80),
+                    note_type=self.rng.choice(('video', 'lecture', 'summary', 'other')),
+                    video_id=video_id if self.rng.random() < 0.7 else None,
+                    subject_id=self.rng.choice(self.subject_ids),
+                    teacher_id=self.rng.choice(self.teacher_ids),
+                    is_public=self.rng.random() < 0.8,
+                    created_at=self.past(after=created), updated_at=self.now,
+                )
+
+        self.bulk(Note, notes())
+
+    def pick_videos(self, count):
+        picked = self.rng.choices(self.videos, cum_weights=self.popularity, k=count)
+        return list({video_id: created for video_id, created in picked}.items())
+
+    def create_memberships(self):
+        Subjects = UserProfile.subjects.through
+        Saved = UserProfile.saved_videos.through
+
+        def enrolments():
+            for profile_id in self.profile_ids.values():
+                count = self.rng.randint(0, SUBJECTS_PER_STUDENT * 2)
+                for subject_id in set(self.rng.sample(self.subject_ids, min(count, len(self.subject_ids)))):
+                    yield Subjects(userprofile_id=profile_id, subject_id=subject_id)
+
+        def saves():
+            for profile_id in self.profile_ids.values():
+                count = int(self.rng.expovariate(1.0 / SAVED_PER_STUDENT))
+                for video_id, _ in self.pick_videos(count):
+                    yield Saved(userprofile_id=profile_id, videocontent_id=video_id)
+
+        self.bulk(Subjects, enrolments())
+        self.bulk(Saved, saves())
+
+    def create_views(self):
+        total = self.counts['views']
+        logged_in = int(total * (1 - ANONYMOUS_VIEW_SHARE))
+        # Heavy-tailed activity: a few students watch a lot, most only a little
+        activity = list(accumulate(1.0 / (rank + 1) ** 0.8 for rank in range(len(self.student_ids))))
+        students = self.student_ids[:]
+        self.rng.shuffle(students)
+        per_student = {}
+        for user_id in self.rng.choices(students, cum_weights=activity, k=logged_in):
+            per_student[user_id] = per_student.get(user_id, 0) + 1
+
+        def views():
+            for user_id, count in per_student.items():
+                # One row per (student, video), as the detail views record them
+                for video_id, created in self.pick_videos(count):
+                    yield VideoView(
+                        video_id=video_id, user_id=user_id,
+                        ip_address=f'10.{self.rng.randint(0, 255)}.{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}',
+                        created_at=self.past(after=created),
+                    )
+            for _ in range(total - logged_in):
+                video_id, created = self.pick_videos(1)[0]
+                yield VideoView(
+                    video_id=video_id, session_key='%032x' % self.rng.getrandbits(128),
+                    created_at=self.past(after=created),
+                )
+
+        self.bulk(VideoView, views())
+        # view_count mirrors the generated history
+        views_per_video = VideoView.objects.filter(video=OuterRef('pk')).order_by().values('video').annotate(
+            total=Count('id')
+        ).values('total')
+        VideoContent.objects.filter(video_file__startswith=SYNTHETIC_VIDEO_DIR).update(
+            view_count=Coalesce(Subquery(views_per_video), 0)
+        )
@@ -0,0 +1,107 @@
+"""
+PostgreSQL with a per-process psycopg_pool connection pool.
+
+Django 4.2 opens a server connection per request (or keeps one per thread
+with CONN_MAX_AGE). With ``OPTIONS['pool']`` set, "connecting" borrows a
+connection from a psycopg_pool.ConnectionPool and "closing" at the end of
+the request hands it back, so each worker reuses a few warm connections
+across requests and threads (the view_events writer, ASGI's sync threads).
+Pools are created on first use and keyed by process id, so gunicorn workers
+forked with --preload never share one.
+
+``OPTIONS['pool']`` is True or a dict of ConnectionPool arguments (min_size,
+max_size, timeout, ...); with CONN_HEALTH_CHECKS the pool checks connections
+before lending them. Django 5.1+ supports the same setting natively, so this
+backend can go once the project upgrades.
+"""
+import os
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from django.utils.asyncio import async_unsafe
+from psycopg import IsolationLevel
+from psycopg_pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def close_pools(name=None):
+    """Close this process's pools (only those for database ``name``, if given)."""
+    with _pools_lock:
+        for key in [key for key in _pools if name is None or key[2] == name]:
+            _pools.pop(key).close()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    # Idle pooled connections would block dropping or cloning the test database
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        close_pools(self.connection.settings_dict['NAME'])
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if not options or self.alias == NO_DB_ALIAS:
+            return None
+        key = (os.getpid(), self.alias, self.settings_dict['NAME'])
+        pool = _pools.get(key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(key)
+                if pool is None:
+                    pool = _pools[key] = self._create_pool({} if options is True else options)
+        return pool
+
+    def _create_pool(self, options):
+        if self.settings_dict['CONN_MAX_AGE']:
+            raise ImproperlyConfigured('Pooled connections go back to the pool after each request; set CONN_MAX_AGE to 0.')
+        pool = ConnectionPool(
+            kwargs=self.get_connection_params(),
+            check=ConnectionPool.check_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None,
+            name=self.alias,
+            open=False,
+            **options,
+        )
+        pool.open()
+        return pool
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection = pool.getconn()
+        # As the parent does after connecting
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = IsolationLevel(options.get('isolation_level', IsolationLevel.READ_COMMITTED))
+        except ValueError:
+            pool.putconn(connection)
+            raise ImproperlyConfigured(f"Invalid transaction isolation level {options['isolation_level']} specified.")
+        if 'isolation_level' in options:
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            connection, self.connection = self.connection, None
+            pool.putconn(connection)
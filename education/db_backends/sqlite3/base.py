@@ -0,0 +1,47 @@
+"""
+SQLite tuned for several gunicorn workers writing to one file.
+
+Django's backend with three changes, configured through ``OPTIONS`` (see
+settings.py):
+
+- ``pragmas``: run on every new connection, e.g. WAL journaling so readers
+  never block the writer, ``synchronous=NORMAL`` (safe with WAL), a larger
+  page cache, mmap'd reads and a busy timeout so a writer waits for the
+  lock instead of failing with "database is locked".
+- ``transaction_mode``: ``atomic()`` blocks start with ``BEGIN IMMEDIATE``
+  rather than a deferred ``BEGIN``. A deferred transaction that reads and
+  then writes has to upgrade its lock, and SQLite fails that upgrade at once
+  (without honouring the busy timeout) when another connection is writing.
+  Taking the write lock up front makes writers queue instead.
+- ``is_usable()`` runs ``SELECT 1`` so CONN_HEALTH_CHECKS can drop a broken
+  persistent connection (Django's SQLite backend always reports True).
+
+The same options exist natively in Django 5.1+ (``init_command`` and
+``transaction_mode``), so this backend can go once the project upgrades.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('pragmas', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict['OPTIONS'].get('pragmas', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
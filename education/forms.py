@@ -7,6 +7,7 @@ from django.contrib.auth.forms import (
 )
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.contrib.auth import get_user_model
 
 # Import models at the bottom of the file to avoid circular imports
@@ -89,13 +90,13 @@ class UserRegistrationForm(UserCreationForm):
         user.email = self.cleaned_data['email']
         user.first_name = self.cleaned_data['first_name']
         user.last_name = self.cleaned_data['last_name']
+        # The post_save receiver creates the profile with these values
+        user.profile_defaults = {'role': self.cleaned_data['role']}
         
         if commit:
-            user.save()
-            UserProfile.objects.create(
-                user=user,
-                role=self.cleaned_data['role']
-            )
+            # User and profile are committed together or not at all
+            with transaction.atomic():
+                user.save()
         return user
 
 
@@ -0,0 +1,93 @@
+"""
+Cached result sets for the homepage.
+
+The three homepage queries are computed together and stored in the default
+cache. Receivers in models.py call the ``*_changed`` hooks below, which only
+drop the cache when the saved row can actually affect what is shown.
+
+The default cache is per worker, so the cache key carries a version number
+kept in the 'shared' cache. Invalidating bumps the version, which retires
+every worker's copy at once instead of only the copy of the worker that
+handled the save.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import caching
+
+CACHE_KEY = 'homepage:data'
+VERSION_KEY = 'homepage:version'
+
+# Fields whose changes never show up on the homepage
+VIDEO_IGNORED_FIELDS = {'view_count', 'processing_status', 'hls_manifest'}
+
+
+def compute_homepage_data():
+    from .models import Subject, UserProfile, VideoContent
+
+    # Get featured subjects
+    featured_subjects = Subject.objects.order_by('-published_video_count')[:6]
+    
+    # Get latest videos
+    latest_videos = VideoContent.objects.filter(
+        is_published=True
+    ).select_related('teacher', 'subject').order_by('-created_at')[:8]
+    
+    # Get popular teachers (teachers with most videos)
+    popular_teachers = UserProfile.objects.filter(
+        role='teacher',
+        is_approved=True,
+        published_video_count__gt=0,
+    ).select_related('user').order_by('-published_video_count')[:4]
+    
+    return {
+        'featured_subjects': list(featured_subjects),
+        'latest_videos': list(latest_videos),
+        'popular_teachers': list(popular_teachers),
+    }
+
+
+def data_key():
+    """The default-cache key of the current homepage data."""
+    shared = caches['shared']
+    version = shared.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost version never brings back an old entry
+        shared.add(VERSION_KEY, time.time_ns())
+        version = shared.get(VERSION_KEY)
+    return f'{CACHE_KEY}:{version}'
+
+
+def get_homepage_data():
+    return caching.get_or_compute(data_key(), compute_homepage_data, settings.HOMEPAGE_CACHE_TIMEOUT)
+
+
+def invalidate():
+    shared = caches['shared']
+    shared.add(VERSION_KEY, time.time_ns())
+    shared.incr(VERSION_KEY)
+
+
+def video_changed(instance, update_fields=None):
+    if update_fields is not None and set(update_fields) <= VIDEO_IGNORED_FIELDS:
+        return
+    invalidate()
+
+
+def subject_changed(instance, update_fields=None):
+    invalidate()
+
+
+def profile_changed(instance, update_fields=None):
+    # Profiles are no longer saved on login, so any save may be a teacher
+    # being approved, renamed or changing role
+    invalidate()
+
+
+def user_changed(instance):
+    # Popular teachers show the user's name
+    from .models import UserProfile
+    if UserProfile.objects.filter(user=instance, role='teacher').exists():
+        invalidate()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from education.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Precompute personalised video recommendations for every active student.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Recommendations to store per student.')
+
+    def handle(self, *args, **options):
+        try:
+            students = build_recommendations(limit=options['limit'])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'Built recommendations for {students} student(s).'))
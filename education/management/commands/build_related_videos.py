@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from education.related_videos import build_related_videos
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "viewers also watched" related videos from the view history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every video, not just newly viewed ones.')
+        parser.add_argument('--top-k', type=int, help='Neighbours to keep per video.')
+
+    def handle(self, *args, **options):
+        try:
+            rebuilt = build_related_videos(full=options['full'], top_k=options['top_k'])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt related videos for {rebuilt} video(s).'))
@@ -0,0 +1,40 @@
+from concurrent.futures import as_completed
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from education import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Build resized WebP/JPEG derivatives for existing thumbnails and profile pictures.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-encode derivatives that already exist.')
+
+    def handle(self, *args, **options):
+        names = set()
+        for label, field_name in thumbnails.IMAGE_FIELDS:
+            model = apps.get_model(label)
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            names.update(rows.values_list(field_name, flat=True))
+
+        executor = thumbnails._get_executor()
+        futures = [
+            executor.submit(thumbnails.build_derivatives, settings.MEDIA_ROOT, name, options['force'])
+            for name in sorted(names)
+        ]
+        built = failed = 0
+        for future in as_completed(futures):
+            try:
+                name, entry = future.result()
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'Failed: {exc}')
+                continue
+            cache.set(thumbnails.index_cache_key(name), entry, None)
+            built += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Built derivatives for {built} image(s), {failed} failed.'))
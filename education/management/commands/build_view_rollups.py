@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from education.rollups import build_rollups
+
+
+class Command(BaseCommand):
+    help = 'Update the daily per-video and per-teacher view rollups from new VideoView rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every day in the view history.')
+
+    def handle(self, *args, **options):
+        days = build_rollups(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Recomputed view rollups for {days} day(s).'))
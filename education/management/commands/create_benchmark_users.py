@@ -0,0 +1,51 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from education.models import Subject, UserProfile
+
+STUDENT_USERNAME = 'bench_student_{}'
+TEACHER_USERNAME = 'bench_teacher_{}'
+DEFAULT_PASSWORD = 'benchmark-pass'
+
+
+class Command(BaseCommand):
+    help = 'Create the student and teacher accounts used by benchmarks/loadtest.py.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50)
+        parser.add_argument('--teachers', type=int, default=5)
+        parser.add_argument('--password', default=DEFAULT_PASSWORD)
+
+    def handle(self, *args, **options):
+        # Hashing is deliberately slow, so hash once and share it
+        password = make_password(options['password'])
+        wanted = [(STUDENT_USERNAME.format(n), 'student') for n in range(options['students'])]
+        wanted += [(TEACHER_USERNAME.format(n), 'teacher') for n in range(options['teachers'])]
+        existing = set(User.objects.filter(username__in=[name for name, _ in wanted]).values_list('username', flat=True))
+        missing = [(name, role) for name, role in wanted if name not in existing]
+
+        with transaction.atomic():
+            # bulk_create skips the post_save receivers, so profiles are created here
+            User.objects.bulk_create([
+                User(username=name, email=f'{name}@example.com', password=password) for name, _ in missing
+            ])
+            users = User.objects.in_bulk([name for name, _ in missing], field_name='username')
+            UserProfile.objects.bulk_create([
+                UserProfile(user=users[name], role=role, is_approved=role == 'teacher') for name, role in missing
+            ])
+            # Give students some subjects so their dashboards have something to show
+            subject_ids = list(Subject.objects.values_list('id', flat=True)[:3])
+            Through = UserProfile.subjects.through
+            Through.objects.bulk_create([
+                Through(userprofile_id=profile_id, subject_id=subject_id)
+                for profile_id in UserProfile.objects.filter(
+                    user__username__in=[name for name, role in missing if role == 'student']
+                ).values_list('id', flat=True)
+                for subject_id in subject_ids
+            ])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(missing)} benchmark account(s), {len(existing)} already existed.'
+        ))
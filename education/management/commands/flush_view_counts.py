@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from education import view_counter
+
+
+class Command(BaseCommand):
+    help = 'Write buffered video view counts to the database immediately.'
+
+    def handle(self, *args, **options):
+        flushed = view_counter.flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} buffered view(s).'))
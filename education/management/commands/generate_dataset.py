@@ -0,0 +1,48 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from education.dataset import BASE_COUNTS, EPOCH, DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a deterministic synthetic dataset for performance work.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help=(
+            'Multiplier for the base row counts ({}).'.format(
+                ', '.join(f'{count} {name}' for name, count in BASE_COUNTS.items())
+            )
+        ))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--now', default=EPOCH.isoformat(), help=(
+            "End of the generated history as an ISO 8601 datetime, or 'current' for the current time. "
+            'Default: %(default)s, so that reruns produce identical data.'
+        ))
+        parser.add_argument('--skip-search-index', action='store_true', help='Do not rebuild the search index afterwards.')
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith='bench_').exists():
+            raise CommandError('Benchmark accounts already exist; generate the dataset into a fresh database.')
+
+        if options['now'] == 'current':
+            now = timezone.now()
+        else:
+            now = parse_datetime(options['now'])
+            if now is None:
+                raise CommandError(f"--now: '{options['now']}' is not an ISO 8601 datetime.")
+            if timezone.is_naive(now):
+                now = timezone.make_aware(now)
+
+        started = time.monotonic()
+        generator = DatasetGenerator(
+            scale=options['scale'], seed=options['seed'], now=now, log=self.stdout.write,
+        )
+        generator.run()
+        if not options['skip_search_index']:
+            call_command('rebuild_search_index', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Generated dataset in {time.monotonic() - started:.1f}s.'))
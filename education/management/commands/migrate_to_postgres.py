@@ -0,0 +1,36 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from education.postgres_migration import CHUNK_SIZE, migrate_to_postgres
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream an existing SQLite database into the PostgreSQL database configured by DATABASE_URL. '
+        'Run `migrate` against both databases first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=os.path.join(settings.BASE_DIR, 'db.sqlite3'),
+                            help='SQLite file to copy (opened read-only). Default: db.sqlite3.')
+        parser.add_argument('--database', default='default', help='Target database alias.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows read and written per batch.')
+        parser.add_argument('--flush', action='store_true', help='Empty the target tables first if they hold rows.')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['source']):
+            raise CommandError(f"{options['source']} does not exist.")
+        started = time.monotonic()
+        try:
+            copied = migrate_to_postgres(
+                options['source'], using=options['database'], chunk_size=options['chunk_size'],
+                flush=options['flush'], log=self.stdout.write,
+            )
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f'Copied {sum(copied.values())} rows from {len(copied)} tables in {time.monotonic() - started:.1f}s.'
+        ))
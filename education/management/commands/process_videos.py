@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from education.models import VideoContent
+from education.video_processing import claimable, process_video
+
+
+class Command(BaseCommand):
+    help = 'Package pending videos into HLS renditions (runs outside the web workers).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('video_ids', nargs='*', type=int, help='Only process these videos.')
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry videos that failed before.')
+
+    def handle(self, *args, **options):
+        statuses = ['pending', 'failed'] if options['retry_failed'] else ['pending']
+        # Also reclaims rows left 'processing' by a worker that died
+        videos = VideoContent.objects.filter(claimable(statuses)).exclude(video_file='')
+        if options['video_ids']:
+            videos = videos.filter(id__in=options['video_ids'])
+
+        for video_id in videos.values_list('id', flat=True):
+            if process_video(video_id):
+                self.stdout.write(self.style.SUCCESS(f'Video {video_id}: ready'))
+            else:
+                self.stdout.write(self.style.WARNING(f'Video {video_id}: skipped or failed'))
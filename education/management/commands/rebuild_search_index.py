@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from education import search
+from education.models import Note, UserProfile, VideoContent
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the database.'
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        querysets = [
+            VideoContent.objects.filter(is_published=True),
+            Note.objects.filter(is_public=True),
+            UserProfile.objects.filter(role='teacher', is_approved=True).select_related('user'),
+        ]
+        indexed = 0
+        with transaction.atomic():
+            backend.clear()
+            for queryset in querysets:
+                for instance in queryset.iterator(chunk_size=1000):
+                    backend.index(search.document_for(instance))
+                    indexed += 1
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} document(s).'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from education.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute published-video counters on subjects and teacher profiles.'
+
+    def handle(self, *args, **options):
+        subjects, profiles = reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f'Repaired {subjects} subject(s) and {profiles} teacher profile(s).'
+        ))
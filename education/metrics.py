@@ -0,0 +1,148 @@
+"""
+Prometheus metrics, exposed at /metrics.
+
+``MetricsMiddleware`` records, per resolved URL name, request latency, response
+status, and the number and total time of SQL statements the request ran.
+``record_cache()`` counts hits and misses of the application caches
+(homepage, popular videos, sampling arrays, thumbnail indexes). The view
+event queue reports its depth, throughput and drops here too.
+
+Under gunicorn every worker is its own process, so start.sh points
+PROMETHEUS_MULTIPROC_DIR at an empty directory before the workers fork.
+prometheus_client then keeps each worker's values in memory-mapped files
+there, and ``metrics_view`` merges them with MultiProcessCollector, whichever
+worker answers the scrape. gunicorn.conf.py cleans up after workers that exit.
+
+As with the query budgets, only statements run on the request's own thread
+are counted (under ASGI, the thread running its sync code and async ORM
+calls), so the ``blocking()`` worker threads of the async views are not.
+"""
+import os
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+REQUEST_LATENCY = Histogram(
+    'django_http_request_duration_seconds', 'Request latency by URL name.', ['view', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+RESPONSES = Counter('django_http_responses_total', 'Responses by URL name and status.', ['view', 'method', 'status'])
+QUERIES = Histogram(
+    'django_db_queries_per_request', 'SQL statements run per request.', ['view'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+QUERY_TIME = Counter('django_db_query_duration_seconds_total', 'Time spent in SQL statements.', ['view'])
+CACHE_REQUESTS = Counter('django_cache_requests_total', 'Application cache lookups.', ['cache', 'result'])
+
+# VideoView ingestion queue (education/view_events.py)
+VIEW_EVENTS_ENQUEUED = Counter('video_view_events_enqueued_total', 'View events accepted by the ingestion queue.')
+VIEW_EVENTS_WRITTEN = Counter('video_view_events_written_total', 'View events sent to the database in batches.')
+VIEW_EVENTS_DROPPED = Counter('video_view_events_dropped_total', 'View events that were not stored.', ['reason'])
+VIEW_EVENTS_QUEUED = Gauge(
+    'video_view_events_queued', 'View events waiting to be written.', multiprocess_mode='livesum',
+)
+
+
+def record_cache(name, hit):
+    if settings.METRICS_ENABLED:
+        CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc()
+
+
+class _QueryTimer:
+    # A much cheaper execute_wrapper than query_budget.QueryRecorder: no stack walks
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+class MetricsMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with _QueryTimer() as timer:
+            response = self.get_response(request)
+        return self.observe(request, response, timer, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        # Connections are per thread: hook the ones of the thread that runs
+        # this request's sync code (sync_to_async is thread-sensitive)
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        await sync_to_async(timer.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(timer.__exit__)(None, None, None)
+        return self.observe(request, response, timer, time.perf_counter() - start)
+
+    def observe(self, request, response, timer, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name if match else None) or 'unresolved'
+        REQUEST_LATENCY.labels(view, request.method).observe(elapsed)
+        RESPONSES.labels(view, request.method, str(response.status_code)).inc()
+        QUERIES.labels(view).observe(timer.count)
+        QUERY_TIME.labels(view).inc(timer.duration)
+        return response
+
+
+def _authorized(request):
+    # Without a token the endpoint is only open in development
+    if not settings.METRICS_TOKEN:
+        return settings.DEBUG
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return scheme.lower() == 'bearer' and constant_time_compare(token, settings.METRICS_TOKEN)
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if not _authorized(request):
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Merge the values written by every worker process
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0004_auto_20231021_1954'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videocontent',
+            name='hls_manifest',
+            field=models.CharField(blank=True, help_text='Master playlist, relative to MEDIA_ROOT', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='videocontent',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    Subject = apps.get_model('education', 'Subject')
+    UserProfile = apps.get_model('education', 'UserProfile')
+    VideoContent = apps.get_model('education', 'VideoContent')
+
+    for model, field, outer_field in ((Subject, 'subject', 'pk'), (UserProfile, 'teacher', 'user_id')):
+        counts = VideoContent.objects.filter(
+            is_published=True, **{field: OuterRef(outer_field)}
+        ).order_by().values(field).annotate(total=Count('id')).values('total')
+        model.objects.update(published_video_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0005_videocontent_hls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subject',
+            name='published_video_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='published_video_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
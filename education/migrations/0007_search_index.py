@@ -0,0 +1,50 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:41
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases use a different SEARCH_BACKEND
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS education_search_index "
+        "USING fts5(kind UNINDEXED, title, body, tokenize = 'porter unicode61 remove_diacritics 2')"
+    )
+    # Index what is already there; receivers keep it current from here on.
+    # Rowids follow search.rowid_for(): id * 3 + position in search.KINDS.
+    schema_editor.execute(
+        "INSERT INTO education_search_index (rowid, kind, title, body) "
+        "SELECT id * 3, 'video', title, description FROM education_videocontent WHERE is_published"
+    )
+    schema_editor.execute(
+        "INSERT INTO education_search_index (rowid, kind, title, body) "
+        "SELECT id * 3 + 1, 'note', title, content FROM education_note WHERE is_public"
+    )
+    # Same title and body as search.document_for()
+    schema_editor.execute(
+        "INSERT INTO education_search_index (rowid, kind, title, body) "
+        "SELECT p.id * 3 + 2, 'teacher', "
+        "COALESCE(NULLIF(TRIM(u.first_name || ' ' || u.last_name), ''), u.username), "
+        "u.username || CASE p.qualification WHEN '' THEN '' ELSE ' ' || p.qualification END "
+        "|| CASE p.bio WHEN '' THEN '' ELSE ' ' || p.bio END "
+        "FROM education_userprofile p JOIN auth_user u ON u.id = p.user_id "
+        "WHERE p.role = 'teacher' AND p.is_approved"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS education_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0006_published_video_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0009_recommendedvideo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='videocontent',
+            index=models.Index(fields=['subject', 'is_published', '-created_at', '-id'], name='video_subject_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videocontent',
+            index=models.Index(fields=['subject', 'is_published', '-view_count', '-id'], name='video_subject_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videocontent',
+            index=models.Index(fields=['teacher', 'is_published', '-created_at', '-id'], name='video_teacher_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videocontent',
+            index=models.Index(fields=['teacher', 'is_published', '-view_count', '-id'], name='video_teacher_popular_idx'),
+        ),
+    ]
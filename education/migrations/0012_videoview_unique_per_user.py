@@ -0,0 +1,32 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:55
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_views(apps, schema_editor):
+    # Keep the first view of each (video, user) pair
+    VideoView = apps.get_model('education', 'VideoView')
+    first_ids = VideoView.objects.filter(user__isnull=False).order_by().values('video', 'user').annotate(
+        first_id=Min('id')
+    ).values('first_id')
+    VideoView.objects.filter(user__isnull=False).exclude(id__in=first_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0011_subject_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_views, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='videoview',
+            name='education_v_video_i_44b95c_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='videoview',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('video', 'user'), name='unique_video_view_per_user'),
+        ),
+    ]
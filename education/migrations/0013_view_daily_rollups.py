@@ -0,0 +1,72 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('education', '0012_videoview_unique_per_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_users', models.PositiveIntegerField(default=0)),
+                ('anonymous_sessions', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['teacher', 'day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VideoDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_users', models.PositiveIntegerField(default=0)),
+                ('anonymous_sessions', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['video', 'day'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='videoview',
+            index=models.Index(fields=['created_at'], name='videoview_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='videodailystats',
+            name='video',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='education.videocontent'),
+        ),
+        migrations.AddField(
+            model_name='teacherdailystats',
+            name='teacher',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_view_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='videodailystats',
+            index=models.Index(fields=['day'], name='video_daily_stats_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='videodailystats',
+            constraint=models.UniqueConstraint(fields=('video', 'day'), name='unique_video_daily_stats'),
+        ),
+        migrations.AddIndex(
+            model_name='teacherdailystats',
+            index=models.Index(fields=['day'], name='teacher_daily_stats_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='teacherdailystats',
+            constraint=models.UniqueConstraint(fields=('teacher', 'day'), name='unique_teacher_daily_stats'),
+        ),
+    ]
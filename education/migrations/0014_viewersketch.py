@@ -0,0 +1,28 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0013_view_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewerSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('video', 'Video'), ('teacher', 'Teacher')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('day', models.DateField()),
+                ('registers', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='viewersketch',
+            constraint=models.UniqueConstraint(fields=('scope', 'object_id', 'day'), name='unique_viewer_sketch'),
+        ),
+    ]
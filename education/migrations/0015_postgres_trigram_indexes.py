@@ -0,0 +1,52 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:40
+
+from django.db import migrations
+
+# (index name, table, column). Trigram GIN indexes on UPPER(column) serve the
+# `UPPER(column::text) LIKE UPPER('%...%')` that icontains compiles to, which
+# is how SimpleBackend searches on PostgreSQL.
+TRIGRAM_INDEXES = [
+    ('video_title_trgm_idx', 'education_videocontent', 'title'),
+    ('video_description_trgm_idx', 'education_videocontent', 'description'),
+    ('note_title_trgm_idx', 'education_note', 'title'),
+    ('note_content_trgm_idx', 'education_note', 'content'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # PostgreSQL-only; SQLite searches through the FTS5 table of migration 0007
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            # pg_trgm ships in the server's contrib package. Search works without it,
+            # unindexed; install it and migrate back to 0014 and forward to add them.
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        # CONCURRENTLY keeps the tables writable while a large index builds
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('education', '0014_viewersketch'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
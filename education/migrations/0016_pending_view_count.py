@@ -0,0 +1,21 @@
+# Generated by Django 4.2.25 on 2026-10-18 06:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0015_postgres_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingViewCount',
+            fields=[
+                ('video', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='education.videocontent')),
+                ('pending', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
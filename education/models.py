@@ -1,8 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
 from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from django.utils.text import slugify
 from django.urls import reverse
 import os
@@ -15,6 +16,10 @@ def note_upload_path(instance, filename):
     # File will be uploaded to MEDIA_ROOT/notes/teacher_<id>/<filename>
     return os.path.join('notes', f"teacher_{instance.teacher.id}", filename)
 
+def hls_output_path(instance):
+    # HLS renditions live next to the upload: MEDIA_ROOT/videos/teacher_<id>/hls/<video id>/
+    return os.path.join('videos', f"teacher_{instance.teacher_id}", 'hls', str(instance.id))
+
 def thumbnail_upload_path(instance, filename):
     # File will be uploaded to MEDIA_ROOT/thumbnails/teacher_<id>/<filename>
     return os.path.join('thumbnails', f"teacher_{instance.teacher.id}", filename)
@@ -24,7 +29,10 @@ class Subject(models.Model):
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     thumbnail = models.ImageField(upload_to='subject_thumbnails/', blank=True, null=True)
+    # Maintained by signals, see education/counters.py
+    published_video_count = models.PositiveIntegerField(default=0, db_index=True)
     
     class Meta:
         ordering = ['name']
@@ -48,6 +56,13 @@ class VideoContent(models.Model):
         ('advanced', 'Advanced'),
     ]
     
+    PROCESSING_STATUSES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, blank=True)
     description = models.TextField(blank=True)
@@ -64,6 +79,11 @@ class VideoContent(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     is_published = models.BooleanField(default=False)
     view_count = models.PositiveIntegerField(default=0)
+    
+    # Adaptive-bitrate (HLS) packaging, see education/video_processing.py
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_STATUSES, default='pending')
+    hls_manifest = models.CharField(max_length=255, blank=True, help_text="Master playlist, relative to MEDIA_ROOT")
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -71,11 +91,39 @@ class VideoContent(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Video Lecture'
         verbose_name_plural = 'Video Lectures'
+        # Cover the keyset-paginated listings, see education/pagination.py
+        indexes = [
+            models.Index(fields=['subject', 'is_published', '-created_at', '-id'], name='video_subject_newest_idx'),
+            models.Index(fields=['subject', 'is_published', '-view_count', '-id'], name='video_subject_popular_idx'),
+            models.Index(fields=['teacher', 'is_published', '-created_at', '-id'], name='video_teacher_newest_idx'),
+            models.Index(fields=['teacher', 'is_published', '-view_count', '-id'], name='video_teacher_popular_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored file so save() can tell when it is replaced
+        if 'video_file' in field_names:
+            instance._loaded_video_file = values[field_names.index('video_file')]
+        # ...and the fields the published-video counters depend on
+        if all(name in field_names for name in ('is_published', 'subject_id', 'teacher_id')):
+            instance._loaded_counter_state = tuple(
+                values[field_names.index(name)] for name in ('is_published', 'subject_id', 'teacher_id')
+            )
+        return instance
     
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = f"{slugify(self.title)}-{self.id or ''}"
+        loaded_video_file = getattr(self, '_loaded_video_file', None)
+        if loaded_video_file is not None and loaded_video_file != self.video_file.name:
+            # New upload: the old renditions no longer apply
+            self.processing_status = 'pending'
+            self.hls_manifest = ''
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'processing_status', 'hls_manifest'}
         super().save(*args, **kwargs)
+        self._loaded_video_file = self.video_file.name
     
     def __str__(self):
         return self.title
@@ -84,8 +132,21 @@ class VideoContent(models.Model):
         return reverse('video_detail', kwargs={'slug': self.slug, 'pk': self.id})
     
     def increment_view_count(self):
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+        from .view_counter import record_view, live_view_count
+        record_view(self.id)
+        self.view_count = live_view_count(self)
+    
+    @property
+    def hls_ready(self):
+        return self.processing_status == 'ready' and bool(self.hls_manifest)
+    
+    @property
+    def hls_manifest_url(self):
+        if not self.hls_ready:
+            return ''
+        # Served by streaming.stream_hls, which applies the draft/owner check;
+        # the rendition playlists and segments resolve relative to this URL
+        return reverse('video_hls', kwargs={'pk': self.id, 'name': os.path.basename(self.hls_manifest)})
     
     @property
     def duration_formatted(self):
@@ -104,14 +165,138 @@ class VideoView(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['video', 'user']),
             models.Index(fields=['video', 'session_key']),
+            # Day-by-day scans in education/rollups.py
+            models.Index(fields=['created_at'], name='videoview_created_idx'),
+        ]
+        constraints = [
+            # One row per signed-in viewer; view_events.py inserts with ignore_conflicts
+            models.UniqueConstraint(
+                fields=['video', 'user'], condition=models.Q(user__isnull=False), name='unique_video_view_per_user',
+            ),
         ]
     
     def __str__(self):
         return f"View of {self.video.title} by {self.user.username if self.user else 'Anonymous'}"
 
 
+class PendingViewCount(models.Model):
+    """Views not yet added to VideoContent.view_count, see education/view_counter.py."""
+    video = models.OneToOneField('VideoContent', on_delete=models.CASCADE, primary_key=True, related_name='+')
+    pending = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.pending} pending view(s) of video {self.video_id}"
+
+
+class RelatedVideo(models.Model):
+    """Precomputed "viewers also watched" neighbours, see education/related_videos.py."""
+    video = models.ForeignKey('VideoContent', on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey('VideoContent', on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    
+    class Meta:
+        ordering = ['video', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['video', 'rank'], name='unique_related_video_rank'),
+        ]
+    
+    def __str__(self):
+        return f"#{self.rank} for video {self.video_id}: video {self.related_id}"
+
+
+class RecommendedVideo(models.Model):
+    """Per-student recommendations written by `manage.py build_recommendations`."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommendations')
+    video = models.ForeignKey('VideoContent', on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    
+    class Meta:
+        ordering = ['user', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'rank'], name='unique_recommended_video_rank'),
+        ]
+    
+    def __str__(self):
+        return f"#{self.rank} for user {self.user_id}: video {self.video_id}"
+
+
+class VideoDailyStats(models.Model):
+    """Views of one video on one day, maintained by `manage.py build_view_rollups`."""
+    video = models.ForeignKey('VideoContent', on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    unique_users = models.PositiveIntegerField(default=0)
+    anonymous_sessions = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['video', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['video', 'day'], name='unique_video_daily_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='video_daily_stats_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Video {self.video_id} on {self.day}: {self.views} views"
+
+
+class TeacherDailyStats(models.Model):
+    """Views of all of a teacher's videos on one day, maintained alongside VideoDailyStats."""
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_view_stats')
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    unique_users = models.PositiveIntegerField(default=0)
+    anonymous_sessions = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['teacher', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['teacher', 'day'], name='unique_teacher_daily_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='teacher_daily_stats_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Teacher {self.teacher_id} on {self.day}: {self.views} views"
+
+
+class ViewerSketch(models.Model):
+    """HyperLogLog of one day's distinct viewers of a video or a teacher, see education/unique_viewers.py."""
+    SCOPES = [
+        ('video', 'Video'),
+        ('teacher', 'Teacher'),
+    ]
+    
+    scope = models.CharField(max_length=10, choices=SCOPES)
+    object_id = models.PositiveBigIntegerField()
+    day = models.DateField()
+    registers = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'object_id', 'day'], name='unique_viewer_sketch'),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope} {self.object_id} on {self.day}"
+
+
+class ProcessingWatermark(models.Model):
+    """Highest row id a batch job has already consumed, keyed by job name."""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
+
 class Note(models.Model):
     NOTE_TYPES = [
         ('video', 'Video Notes'),
@@ -170,6 +355,8 @@ class UserProfile(models.Model):
     qualification = models.CharField(max_length=255, blank=True)
     hourly_rate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     is_approved = models.BooleanField(default=False)
+    # Maintained by signals, see education/counters.py
+    published_video_count = models.PositiveIntegerField(default=0, db_index=True)
     
     # Social links
     website = models.URLField(blank=True)
@@ -212,16 +399,140 @@ class UserProfile(models.Model):
         return Note.objects.none()
 
 
-# Signal to automatically create a UserProfile when a User is created
+# Create the UserProfile once, together with the User. Forms set
+# ``user.profile_defaults`` (e.g. the chosen role) before saving. Later saves of
+# the User, such as the last_login update on every login, do not touch it.
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created:
-        UserProfile.objects.create(user=instance)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserProfile.objects.create(user=instance, **getattr(instance, 'profile_defaults', {}))
+
+
+# Queue newly uploaded (or replaced) videos for HLS packaging once the row is committed
+@receiver(post_save, sender=VideoContent)
+def queue_video_processing(sender, instance, **kwargs):
+    if instance.processing_status == 'pending' and instance.video_file:
+        from .video_processing import enqueue
+        transaction.on_commit(lambda: enqueue(instance.id))
+
+
+# Build resized WebP/JPEG derivatives for uploaded images
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=VideoContent)
+@receiver(post_save, sender=UserProfile)
+def queue_image_derivatives(sender, instance, **kwargs):
+    from .thumbnails import queue_missing_derivatives
+    queue_missing_derivatives(instance)
+
+
+# Keep the cached homepage data in step with the rows it is built from
+@receiver(post_save, sender=VideoContent)
+@receiver(post_delete, sender=VideoContent)
+def invalidate_homepage_for_video(sender, instance, update_fields=None, **kwargs):
+    from . import homepage_cache
+    homepage_cache.video_changed(instance, update_fields)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_homepage_for_subject(sender, instance, update_fields=None, **kwargs):
+    from . import homepage_cache
+    homepage_cache.subject_changed(instance, update_fields)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_homepage_for_profile(sender, instance, update_fields=None, **kwargs):
+    from . import homepage_cache
+    homepage_cache.profile_changed(instance, update_fields)
 
 
-# Signal to save the UserProfile whenever the User is saved
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    # Use get_or_create to ensure we have a profile
-    profile, created = UserProfile.objects.get_or_create(user=instance)
-    profile.save()
\ No newline at end of file
+def user_details_changed(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    # Logins only touch last_login
+    if created or raw or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    # The API's ETag watermarks see user names through the profile's updated_at
+    UserProfile.objects.filter(user=instance).update(updated_at=timezone.now())
+    from . import homepage_cache
+    homepage_cache.user_changed(instance)
+
+
+# Keep Subject/UserProfile.published_video_count in step with the videos
+@receiver(post_save, sender=VideoContent)
+def update_published_video_counts(sender, instance, created, raw=False, **kwargs):
+    from .counters import counter_state, video_changed
+    if raw:
+        return
+    old_state = None if created else getattr(instance, '_loaded_counter_state', None)
+    new_state = counter_state(instance)
+    if created or old_state is not None:
+        if old_state != new_state:
+            video_changed(old_state, new_state)
+        instance._loaded_counter_state = new_state
+
+
+@receiver(post_delete, sender=VideoContent)
+def decrement_published_video_counts(sender, instance, **kwargs):
+    from .counters import counter_state, video_changed
+    video_changed(getattr(instance, '_loaded_counter_state', counter_state(instance)), None)
+
+
+# Keep the full-text search index current
+@receiver(post_save, sender=VideoContent)
+@receiver(post_save, sender=Note)
+@receiver(post_save, sender=UserProfile)
+def update_search_index(sender, instance, update_fields=None, raw=False, **kwargs):
+    from . import search
+    if raw or (update_fields is not None and set(update_fields) <= search.IGNORED_FIELDS):
+        return
+    search.update_index(instance)
+
+
+@receiver(post_delete, sender=VideoContent)
+@receiver(post_delete, sender=Note)
+@receiver(post_delete, sender=UserProfile)
+def remove_from_search_index(sender, instance, **kwargs):
+    from . import search
+    search.remove_from_index(instance)
+
+
+@receiver(post_save, sender=User)
+def update_teacher_search_index(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    # Teacher documents include the user's name; logins only touch last_login
+    if created or raw or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    from . import search
+    profile = UserProfile.objects.filter(user=instance, role='teacher').first()
+    if profile is not None:
+        profile.user = instance
+        search.update_index(profile)
+
+
+# Retire the cached id arrays used for random video sampling
+@receiver(post_save, sender=VideoContent)
+@receiver(post_delete, sender=VideoContent)
+def invalidate_video_sampling(sender, instance, update_fields=None, **kwargs):
+    from . import sampling
+    if update_fields is not None and not {'is_published', 'subject'} & set(update_fields):
+        return
+    sampling.invalidate()
+
+
+# Keep the per-user saved-id caches (saved_sets.py) in step with the relations
+@receiver(m2m_changed, sender=UserProfile.saved_videos.through)
+def saved_videos_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    from . import saved_sets
+    saved_sets.relation_changed(instance, action, reverse, pk_set, saved_sets.VIDEOS)
+
+
+@receiver(m2m_changed, sender=UserProfile.saved_notes.through)
+def saved_notes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    from . import saved_sets
+    saved_sets.relation_changed(instance, action, reverse, pk_set, saved_sets.NOTES)
+
+
+@receiver(post_delete, sender=UserProfile)
+def forget_saved_sets(sender, instance, **kwargs):
+    from . import saved_sets
+    saved_sets.profile_deleted(instance)
@@ -0,0 +1,198 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of OFFSET/LIMIT plus a COUNT(*), each page is fetched with a WHERE
+clause that continues after the last row of the previous page, e.g. for
+``('-created_at', '-id')``::
+
+    WHERE created_at < %s OR (created_at = %s AND id < %s)
+    ORDER BY created_at DESC, id DESC LIMIT per_page + 1
+
+so page 100 costs the same as page 1 as long as an index covers the ordering.
+The position is handed to the client as an opaque signed cursor, so it can
+not be forged into arbitrary filters. The ordering fields must be non-null;
+``id`` is appended as a tie-breaker when missing.
+
+Anything that is not a QuerySet can be paginated too by passing an object
+with ``fetch(boundary, reverse, limit)``, ``key(item)``, ``parse(values)``
+and ``signature`` (see search.SearchResults).
+"""
+from django.core import signing
+from django.db.models import Q, QuerySet
+
+CURSOR_SALT = 'education.pagination'
+CURSOR_PARAM = 'cursor'
+
+# ?sort= options for video listings; each one is backed by an index on VideoContent
+VIDEO_SORTS = {
+    'newest': ('-created_at', '-id'),
+    'popular': ('-view_count', '-id'),
+}
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _jsonable(value):
+    # Dates and datetimes go through isoformat(); model fields parse them back
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class QuerySetSource:
+    def __init__(self, queryset, ordering):
+        ordering = list(ordering)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        self.queryset = queryset
+        self.ordering = [
+            ('id' if name.lstrip('-') == 'pk' else name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        self.signature = ','.join(ordering)
+
+    def key(self, item):
+        if isinstance(item, dict):
+            return [item[name] for name, _ in self.ordering]
+        return [getattr(item, name) for name, _ in self.ordering]
+
+    def parse(self, values):
+        opts = self.queryset.model._meta
+        if len(values) != len(self.ordering):
+            raise InvalidCursor('Cursor does not match the ordering')
+        try:
+            return [opts.get_field(name).to_python(value) for (name, _), value in zip(self.ordering, values)]
+        except Exception as exc:
+            raise InvalidCursor(str(exc))
+
+    def _beyond(self, boundary, reverse):
+        # (a, b, c) > (x, y, z)  ==  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        condition = Q()
+        for position, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            term = Q(**{f'{name}__{lookup}': boundary[position]})
+            for earlier, (previous, _) in enumerate(self.ordering[:position]):
+                term &= Q(**{previous: boundary[earlier]})
+            condition |= term
+        return condition
+
+    def fetch(self, boundary, reverse, limit):
+        queryset = self.queryset
+        if boundary is not None:
+            queryset = queryset.filter(self._beyond(boundary, reverse))
+        order = [('-' if descending != reverse else '') + name for name, descending in self.ordering]
+        return list(queryset.order_by(*order)[:limit])
+
+
+class KeysetPage:
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode(self.object_list[-1], reverse=False)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode(self.object_list[0], reverse=True)
+
+
+class KeysetPaginator:
+    """
+    ``KeysetPaginator(queryset, 20, ordering=('-created_at', '-id')).get_page(cursor)``.
+    Without ``ordering`` the queryset's own order_by() is used.
+    """
+
+    def __init__(self, object_list, per_page, ordering=None):
+        if isinstance(object_list, QuerySet):
+            ordering = ordering or object_list.query.order_by or object_list.model._meta.ordering
+            object_list = QuerySetSource(object_list, ordering)
+        self.source = object_list
+        self.per_page = per_page
+
+    def encode(self, item, reverse=False):
+        values = [_jsonable(value) for value in self.source.key(item)]
+        return signing.dumps({'k': values, 'r': int(reverse), 'o': self.source.signature}, salt=CURSOR_SALT)
+
+    def decode(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            raise InvalidCursor('Bad cursor signature')
+        # A cursor from another listing (or another sort order) is meaningless here
+        if not isinstance(data, dict) or data.get('o') != self.source.signature or not data.get('k'):
+            raise InvalidCursor('Cursor does not belong to this listing')
+        return self.source.parse(data['k']), bool(data.get('r'))
+
+    def page(self, cursor=None):
+        """Return the page at ``cursor``; raises InvalidCursor for a bad one."""
+        boundary, reverse = self.decode(cursor) if cursor else (None, False)
+        # One extra row tells us whether there is another page, no COUNT(*) needed
+        items = self.source.fetch(boundary, reverse, self.per_page + 1)
+        more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if not reverse:
+            return KeysetPage(items, self, has_next=more, has_previous=boundary is not None)
+        if not more:
+            # Walked back to the start; show a full first page instead of a short one
+            return self.page(None)
+        items.reverse()
+        return KeysetPage(items, self, has_next=True, has_previous=True)
+
+    def get_page(self, cursor=None):
+        """Like page() but falls back to the first page for a bad or stale cursor."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+
+def video_sort(request):
+    """``(sort name, ordering)`` for the ``?sort=`` in ``request``, newest first by default."""
+    sort = request.GET.get('sort')
+    if sort not in VIDEO_SORTS:
+        sort = 'newest'
+    return sort, VIDEO_SORTS[sort]
+
+
+def paginate(request, object_list, per_page, ordering=None):
+    """Page of ``object_list`` for the ``?cursor=`` in ``request``."""
+    return KeysetPaginator(object_list, per_page, ordering).get_page(request.GET.get(CURSOR_PARAM))
+
+
+class KeysetPaginationMixin:
+    """
+    Drop-in for ListView's page-number pagination. Set ``paginate_by`` and,
+    optionally, ``keyset_ordering``; templates get ``page_obj`` with
+    ``next_cursor``/``previous_cursor`` instead of page numbers.
+    """
+    keyset_ordering = None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_ordering)
+        page = paginator.get_page(self.request.GET.get(CURSOR_PARAM))
+        return paginator, page, page.object_list, page.has_other_pages()
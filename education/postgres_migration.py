@@ -0,0 +1,143 @@
+"""
+Copy an existing SQLite database into PostgreSQL, behind ``manage.py migrate_to_postgres``.
+
+The SQLite file is opened read-only as an extra connection and every
+model's table is streamed through the ORM: rows are read with iterator() in
+primary-key order and written with chunked bulk_create() in per-chunk
+transactions, so memory use is bounded by the chunk size rather than the
+database. Going through the models converts SQLite's loosely typed values
+(0/1 booleans, text timestamps and decimals) into proper PostgreSQL types.
+Primary keys are kept, tables are copied parents first, created_at /
+updated_at are preserved and signals are muted. Sequences are reset
+afterwards so new rows continue after the copied ids.
+
+Both databases must be fully migrated. The target has to be empty apart
+from the content types and permissions ``migrate`` creates; those are
+replaced by the source's rows so their ids match.
+"""
+from django.apps import apps
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, router, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import load_backend
+
+from .dataset import explicit_timestamps, signals_muted
+
+SOURCE_ALIAS = 'sqlite_source'
+CHUNK_SIZE = 2000
+# Filled in by ``migrate`` itself, so expected in an otherwise empty target
+MIGRATE_CREATED = (ContentType, Permission)
+
+
+def _open_source(path):
+    # configure_settings() fills in the defaults of a DATABASES entry
+    settings_dict = connections.configure_settings({
+        DEFAULT_DB_ALIAS: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': f'file:{path}?mode=ro'},
+    })[DEFAULT_DB_ALIAS]
+    source = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, SOURCE_ALIAS)
+    connections[SOURCE_ALIAS] = source
+    return source
+
+
+def _check_migrated(connection, label):
+    executor = MigrationExecutor(connection)
+    if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+        raise RuntimeError(f'The {label} database has unapplied migrations; run migrate against it first.')
+
+
+def copied_models(using):
+    """Models with a table to copy, each after the models its foreign keys point to."""
+    candidates = [
+        model for model in apps.get_models(include_auto_created=True)
+        if model._meta.managed and not model._meta.proxy and router.allow_migrate_model(using, model)
+    ]
+    ordered, seen = [], set()
+
+    def visit(model):
+        if model in seen:
+            return
+        seen.add(model)
+        for field in model._meta.concrete_fields:
+            if field.is_relation and field.related_model in candidates:
+                visit(field.related_model)
+        ordered.append(model)
+
+    for model in candidates:
+        visit(model)
+    return ordered
+
+
+def _copy_model(model, using, chunk_size):
+    manager = model._base_manager
+    rows = 0
+    chunk = []
+    for instance in manager.using(SOURCE_ALIAS).order_by('pk').iterator(chunk_size=chunk_size):
+        chunk.append(instance)
+        if len(chunk) >= chunk_size:
+            rows += _write(manager, chunk, using)
+            chunk = []
+    if chunk:
+        rows += _write(manager, chunk, using)
+    return rows
+
+
+def _write(manager, chunk, using):
+    with transaction.atomic(using=using):
+        manager.using(using).bulk_create(chunk)
+    return len(chunk)
+
+
+def migrate_to_postgres(source_path, using=DEFAULT_DB_ALIAS, chunk_size=CHUNK_SIZE, flush=False, log=None):
+    """
+    Copy every table of the SQLite database at ``source_path`` into the
+    PostgreSQL database ``using``. Returns ``{model label: rows copied}``.
+    With ``flush`` the target's tables are emptied first instead of having
+    to be empty already.
+    """
+    target = connections[using]
+    if target.vendor != 'postgresql':
+        raise RuntimeError(f"Database '{using}' is not PostgreSQL; point DATABASE_URL at the target server.")
+
+    source = _open_source(source_path)
+    try:
+        try:
+            tables = set(source.introspection.table_names())
+        except DatabaseError as exc:
+            raise RuntimeError(f'Cannot read {source_path}: {exc}') from exc
+        _check_migrated(source, 'SQLite')
+        _check_migrated(target, 'PostgreSQL')
+
+        models = [model for model in copied_models(using) if model._meta.db_table in tables]
+        if not flush:
+            occupied = [
+                model._meta.label for model in models
+                if model not in MIGRATE_CREATED and model._base_manager.using(using).exists()
+            ]
+            if occupied:
+                raise RuntimeError(
+                    f"The target database already has rows in {', '.join(occupied)}; "
+                    'rerun with --flush to replace them.'
+                )
+        target.ops.execute_sql_flush(target.ops.sql_flush(
+            no_style(), [model._meta.db_table for model in models], allow_cascade=True,
+        ))
+
+        copied = {}
+        with signals_muted(), explicit_timestamps(*models):
+            for model in models:
+                try:
+                    copied[model._meta.label] = _copy_model(model, using, chunk_size)
+                except DatabaseError as exc:
+                    raise RuntimeError(f'Copying {model._meta.label} failed: {exc}') from exc
+                if log:
+                    log(f'{model._meta.label}: {copied[model._meta.label]} rows')
+
+        with target.cursor() as cursor:
+            for sql in target.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        return copied
+    finally:
+        source.close()
+        del connections[SOURCE_ALIAS]
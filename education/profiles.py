@@ -0,0 +1,35 @@
+"""
+Request-scoped access to the signed-in user's UserProfile.
+
+``get_profile(request)`` loads the profile at most once per request (a
+missing profile is remembered too) and leaves it cached on ``request.user``,
+so the context processor, the dashboards, templates using ``user.profile``
+and saved_sets.py all share the one query.
+"""
+from django.contrib.auth.models import User
+
+from .models import UserProfile
+
+_UNSET = object()
+
+
+def get_profile(request):
+    """The signed-in user's UserProfile, or None for anonymous users and users without one."""
+    profile = getattr(request, '_profile_cache', _UNSET)
+    if profile is _UNSET:
+        user = getattr(request, 'user', None)
+        profile = None
+        if user is not None and user.is_authenticated:
+            try:
+                profile = user.profile
+            except UserProfile.DoesNotExist:
+                pass
+        request._profile_cache = profile
+    return profile
+
+
+def loaded_profile(user):
+    """``user.profile`` if it has already been loaded on this instance, else None (never queries)."""
+    if User.profile.related.is_cached(user):
+        return User.profile.related.get_cached_value(user)
+    return None
@@ -0,0 +1,165 @@
+"""
+On-demand profiling of single requests.
+
+A request is profiled only when it carries a token signed by a staff member
+(generated on the admin's Profiles page), either as the ``X-Profile-Token``
+header or the ``?_profile=`` query parameter. Everything else pays for one
+dictionary lookup and a substring check.
+
+Profiled requests run under cProfile with the SQL recorder from
+query_budget.py. The wall time is split into SQL (measured per statement),
+template rendering (time spent inside django.template, minus the SQL issued
+from templates), cache (time inside the cache backends) and the remaining
+Python. The raw ``.prof`` file and a JSON summary are written to
+PROFILE_DIR, where staff can browse them from the admin.
+
+Under ASGI, cProfile sees the event loop thread and SQL is recorded on the
+thread running the request's sync code. Other requests sharing the loop
+show up in the profile too, so profile an otherwise idle worker.
+"""
+import cProfile
+import json
+import os
+import pstats
+import time
+import uuid
+from datetime import datetime
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+
+from .query_budget import QueryRecorder
+
+TOKEN_SALT = 'education.profiling'
+HEADER = 'HTTP_X_PROFILE_TOKEN'
+QUERY_PARAM = '_profile'
+
+# Code under these directories counts towards the template/cache buckets
+TEMPLATE_DIR = os.path.join('django', 'template') + os.sep
+CACHE_DIR = os.path.join('django', 'core', 'cache') + os.sep
+
+
+def make_token(user):
+    return signing.dumps({'user': user.pk}, salt=TOKEN_SALT)
+
+
+def check_token(token):
+    """The staff user id the token was issued to, or None if it is invalid or expired."""
+    try:
+        return signing.loads(token, salt=TOKEN_SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE)['user']
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+
+
+def _entry_time(stats, directory):
+    """Cumulative time spent in ``directory``, counted only where it is entered from outside."""
+    total = 0.0
+    for (filename, _, _), (_, _, _, _, callers) in stats.stats.items():
+        if directory not in filename:
+            continue
+        for (caller_file, _, _), (_, _, _, cumulative) in callers.items():
+            if directory not in caller_file:
+                total += cumulative
+    return total
+
+
+def summarize(stats, recorder, wall):
+    sql = recorder.duration
+    sql_in_templates = sum(query['duration'] for query in recorder.queries if query['template'])
+    template = max(_entry_time(stats, TEMPLATE_DIR) - sql_in_templates, 0.0)
+    cache = _entry_time(stats, CACHE_DIR)
+    return {
+        'wall': wall,
+        'sql': sql,
+        'template': template,
+        'cache': cache,
+        'python': max(wall - sql - template - cache, 0.0),
+        'queries': recorder.count,
+    }
+
+
+def save_profile(request, response, profiler, recorder, wall, user_id):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    match = getattr(request, 'resolver_match', None)
+    url_name = (match.url_name if match else None) or 'unresolved'
+    profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{url_name}-{uuid.uuid4().hex[:8]}"
+    base = os.path.join(settings.PROFILE_DIR, profile_id)
+
+    profiler.dump_stats(base + '.prof')
+    stats = pstats.Stats(profiler)
+    summary = {
+        'id': profile_id,
+        'path': request.get_full_path(),
+        'method': request.method,
+        'url_name': url_name,
+        'status': response.status_code,
+        'requested_by': user_id,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'split': summarize(stats, recorder, wall),
+        'slowest_queries': [
+            {key: query[key] for key in ('sql', 'duration', 'template', 'code')}
+            for query in sorted(recorder.queries, key=lambda query: -query['duration'])[:20]
+        ],
+    }
+    with open(base + '.json', 'w') as fh:
+        json.dump(summary, fh, indent=2)
+    return profile_id
+
+
+class ProfilingMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def requested_by(self, request):
+        token = request.META.get(HEADER)
+        if token is None and QUERY_PARAM + '=' in request.META.get('QUERY_STRING', ''):
+            token = request.GET.get(QUERY_PARAM)
+        return check_token(token) if token and settings.PROFILING_ENABLED else None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        user_id = self.requested_by(request)
+        if user_id is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with QueryRecorder(keep_queries=True) as recorder:
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        wall = time.perf_counter() - start
+        response['X-Profile-Id'] = save_profile(request, response, profiler, recorder, wall, user_id)
+        return response
+
+    async def __acall__(self, request):
+        user_id = self.requested_by(request)
+        if user_id is None:
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        recorder = QueryRecorder(keep_queries=True)
+        start = time.perf_counter()
+        await sync_to_async(recorder.__enter__)()
+        try:
+            profiler.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.disable()
+        finally:
+            await sync_to_async(recorder.__exit__)(None, None, None)
+        wall = time.perf_counter() - start
+        response['X-Profile-Id'] = await sync_to_async(save_profile)(
+            request, response, profiler, recorder, wall, user_id,
+        )
+        return response
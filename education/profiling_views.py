@@ -0,0 +1,66 @@
+"""Staff pages under /admin/profiles/ for browsing request profiles, see profiling.py."""
+import io
+import json
+import os
+import pstats
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+from django.contrib import admin
+
+from .profiling import HEADER, QUERY_PARAM, make_token
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+def _profile_path(profile_id, ext):
+    # Ids come from the URL; never let them escape PROFILE_DIR
+    if os.path.basename(profile_id) != profile_id:
+        raise Http404('No such profile')
+    path = os.path.join(settings.PROFILE_DIR, profile_id + ext)
+    if not os.path.exists(path):
+        raise Http404('No such profile')
+    return path
+
+
+def profile_list(request):
+    profiles = []
+    if os.path.isdir(settings.PROFILE_DIR):
+        names = sorted((name for name in os.listdir(settings.PROFILE_DIR) if name.endswith('.json')), reverse=True)
+        for name in names[:200]:
+            with open(os.path.join(settings.PROFILE_DIR, name)) as fh:
+                profiles.append(json.load(fh))
+
+    token = make_token(request.user) if request.method == 'POST' else None
+    return render(request, 'education/admin/profile_list.html', {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': profiles,
+        'token': token,
+        'header': HEADER[len('HTTP_'):].replace('_', '-').title(),
+        'query_param': QUERY_PARAM,
+        'token_max_age': settings.PROFILE_TOKEN_MAX_AGE,
+    })
+
+
+def profile_detail(request, profile_id):
+    with open(_profile_path(profile_id, '.json')) as fh:
+        summary = json.load(fh)
+    sort = request.GET.get('sort') if request.GET.get('sort') in SORT_KEYS else SORT_KEYS[0]
+    output = io.StringIO()
+    stats = pstats.Stats(_profile_path(profile_id, '.prof'), stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(60)
+    return render(request, 'education/admin/profile_detail.html', {
+        **admin.site.each_context(request),
+        'title': f"Profile {profile_id}",
+        'summary': summary,
+        'stats': output.getvalue(),
+        'sort': sort,
+        'sort_keys': SORT_KEYS,
+    })
+
+
+def profile_download(request, profile_id):
+    # Raw cProfile output for snakeviz, pstats, etc.
+    return FileResponse(open(_profile_path(profile_id, '.prof'), 'rb'), as_attachment=True)
@@ -0,0 +1,200 @@
+"""
+Per-request SQL query budgets with N+1 detection.
+
+``QueryRecorder`` hooks every database connection with execute_wrapper() and
+counts statements by their normalised shape (literals and IN lists
+collapsed). Once a shape repeats, it also records where each further copy
+came from: the innermost template node being rendered
+(``education/homepage.html:42``) and the first stack frame in project code.
+Walking the stack is the expensive part, and a single statement never needs
+it, which keeps the recorder cheap enough to stay on in production. A shape
+that runs QUERY_BUDGET_N_PLUS_ONE times or more in one request is reported
+as a likely N+1. ``QueryRecorder(keep_queries=True)`` (used by profiling.py)
+keeps every statement with its origin instead.
+
+``QueryBudgetMiddleware`` applies the recorder to every request and checks the
+result against QUERY_BUDGETS[url_name] (or QUERY_BUDGET_DEFAULT). Violations
+are logged, or raised as QueryBudgetExceeded when QUERY_BUDGET_RAISE is set
+(the default under ``manage.py test``). education/testing.py has helpers
+for asserting budgets around arbitrary code in tests.
+
+Only queries run on the request's own thread are seen. Under ASGI that is
+the thread Django runs the request's sync code and async ORM calls on; the
+``blocking()`` worker threads used by the async views are not counted.
+"""
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(THIS_FILE))
+# Frames of the execute_wrapper()s themselves are never a query's origin
+WRAPPER_FILES = {THIS_FILE, os.path.join(os.path.dirname(THIS_FILE), 'metrics.py')}
+
+_IN_LIST = re.compile(r'\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def normalize(sql):
+    """Shape of ``sql`` with literals and parameter lists collapsed."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _origin():
+    """``(template location, code location)`` of the statement being executed."""
+    template = code = None
+    frame = sys._getframe(1)
+    while frame is not None and not (template and code):
+        filename = frame.f_code.co_filename
+        if template is None and frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                template = f'{origin.template_name or origin.name}:{token.lineno}'
+        if (code is None and filename.startswith(PROJECT_ROOT) and filename not in WRAPPER_FILES
+                and 'site-packages' not in filename):
+            code = f'{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno}'
+        frame = frame.f_back
+    return template, code
+
+
+class QueryRecorder:
+    """Context manager recording every statement run on any connection in this thread."""
+
+    def __init__(self, keep_queries=False):
+        self.keep_queries = keep_queries
+        self.queries = []
+        self.count = 0
+        self.duration = 0.0
+        self._shapes = Counter()
+        self._origins = defaultdict(Counter)
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            shape = normalize(sql)
+            self.count += 1
+            self.duration += duration
+            self._shapes[shape] += 1
+            # Only repeated shapes need to say where they came from
+            if self.keep_queries or self._shapes[shape] > 1:
+                template, code = _origin()
+                self._origins[shape][template or code or '?'] += 1
+                if self.keep_queries:
+                    self.queries.append({
+                        'sql': sql,
+                        'shape': shape,
+                        'duration': duration,
+                        'alias': context['connection'].alias,
+                        'template': template,
+                        'code': code,
+                    })
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def shapes(self):
+        """``{shape: count}``, most frequent first."""
+        return dict(self._shapes.most_common())
+
+    def n_plus_one(self, threshold=None):
+        """Repeated shapes as dicts with the count and the locations that issued the repeats."""
+        threshold = threshold or settings.QUERY_BUDGET_N_PLUS_ONE
+        return [
+            {'shape': shape, 'count': count, 'origins': dict(self._origins[shape].most_common(3))}
+            for shape, count in self.shapes().items()
+            if count >= threshold
+        ]
+
+
+def budget_for(url_name):
+    return settings.QUERY_BUDGETS.get(url_name, settings.QUERY_BUDGET_DEFAULT)
+
+
+def check(recorder, url_name):
+    """Return a list of human-readable budget violations for a recorded request."""
+    problems = []
+    budget = budget_for(url_name)
+    if budget is not None and recorder.count > budget:
+        problems.append(f'{recorder.count} queries (budget {budget})')
+    for repeat in recorder.n_plus_one():
+        where = ', '.join(f'{origin} x{count}' for origin, count in repeat['origins'].items())
+        problems.append(f"likely N+1: {repeat['count']}x {repeat['shape'][:200]} [{where}]")
+    return problems
+
+
+class QueryBudgetMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.QUERY_BUDGET_ENABLED:
+            return self.get_response(request)
+
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        return self.process(request, response, recorder)
+
+    async def __acall__(self, request):
+        if not settings.QUERY_BUDGET_ENABLED:
+            return await self.get_response(request)
+
+        # Connections are per thread: hook the ones of the thread that runs
+        # this request's sync code (sync_to_async is thread-sensitive)
+        recorder = QueryRecorder()
+        await sync_to_async(recorder.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recorder.__exit__)(None, None, None)
+        return self.process(request, response, recorder)
+
+    def process(self, request, response, recorder):
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match else None
+        problems = check(recorder, url_name)
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+        if problems:
+            message = f"Query budget exceeded for {url_name or request.path}: " + '; '.join(problems)
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra={'queries': recorder.count, 'url_name': url_name})
+        return response
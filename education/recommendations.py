@@ -0,0 +1,191 @@
+"""
+Batch-computed personalised recommendations for students.
+
+``build_recommendations()`` scores every published video for every active
+student in one vectorised pass:
+
+    scores = W @ S  +  E @ P
+
+W holds each student's history (watched videos, saved videos weighted higher),
+S is the item-item similarity from the RelatedVideo table, E the enrolled
+subjects and P a popularity prior per subject. Already watched or saved
+videos are masked out, and the top N per student are stored as
+RecommendedVideo rows, so the dashboard needs a single query. Students with
+no stored rows fall back to a cached popular-per-subject list.
+
+Like related_videos.py, NumPy and SciPy are only imported by the batch job.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import caching
+from .models import RecommendedVideo, RelatedVideo, UserProfile, VideoContent, VideoView
+
+SAVED_WEIGHT = 2.0
+WATCHED_WEIGHT = 1.0
+SUBJECT_WEIGHT = 0.5
+POPULAR_PER_SUBJECT = 20
+POPULAR_CACHE_KEY = 'recommendations:popular'
+POPULAR_CACHE_TIMEOUT = 60 * 15
+STUDENT_CHUNK_SIZE = 1000
+
+
+def compute_popular_videos():
+    """``{subject_id: [video ids by views]}`` plus the overall list under key None."""
+    popular = {None: []}
+    videos = VideoContent.objects.filter(is_published=True).order_by('-view_count')
+    popular[None] = list(videos.values_list('id', flat=True)[:POPULAR_PER_SUBJECT])
+    for subject_id, video_id in videos.exclude(subject__isnull=True).values_list('subject_id', 'id').iterator():
+        bucket = popular.setdefault(subject_id, [])
+        if len(bucket) < POPULAR_PER_SUBJECT:
+            bucket.append(video_id)
+    return popular
+
+
+def popular_videos():
+    return caching.get_or_compute(POPULAR_CACHE_KEY, compute_popular_videos, POPULAR_CACHE_TIMEOUT)
+
+
+def recommended_videos_for(user, limit=6):
+    """Stored recommendations for ``user``; popular videos from their subjects when there are none."""
+    recommendations = [
+        entry.video for entry in RecommendedVideo.objects.filter(
+            user=user, video__is_published=True
+        ).select_related('video__teacher', 'video__subject')[:limit]
+    ]
+    if recommendations:
+        return recommendations
+
+    # Cold start: most watched videos in the student's subjects, then overall
+    popular = popular_videos()
+    subject_ids = UserProfile.subjects.through.objects.filter(
+        userprofile__user=user
+    ).values_list('subject_id', flat=True)
+    candidates = []
+    for subject_id in list(subject_ids) + [None]:
+        for video_id in popular.get(subject_id, []):
+            if video_id not in candidates:
+                candidates.append(video_id)
+    candidates = candidates[:limit]
+    videos = VideoContent.objects.filter(is_published=True).select_related('teacher', 'subject').in_bulk(candidates)
+    return [videos[video_id] for video_id in candidates if video_id in videos]
+
+
+def active_students():
+    # Measured back from the latest recorded view rather than the clock, so a
+    # dataset generated with a fixed --now still has active students
+    latest = VideoView.objects.aggregate(latest=Max('created_at'))['latest'] or timezone.now()
+    since = latest - timedelta(days=settings.RECOMMENDATIONS_ACTIVE_DAYS)
+    return UserProfile.objects.filter(role='student', user__last_login__gte=since)
+
+
+def build_recommendations(limit=None):
+    """Recompute recommendations for all active students. Returns the number of students processed."""
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as exc:
+        raise RuntimeError('Building recommendations requires numpy and scipy') from exc
+
+    limit = limit or settings.RECOMMENDATIONS_PER_USER
+    published = np.fromiter(
+        VideoContent.objects.filter(is_published=True).order_by('id').values_list('id', flat=True), dtype=np.int64
+    )
+    if not len(published):
+        return 0
+    column = {int(video_id): index for index, video_id in enumerate(published)}
+    subject_of = dict(VideoContent.objects.filter(is_published=True).values_list('id', 'subject_id'))
+
+    # S: item-item similarity between published videos
+    pairs = [
+        (column[video_id], column[related_id], score)
+        for video_id, related_id, score in RelatedVideo.objects.values_list('video_id', 'related_id', 'score').iterator()
+        if video_id in column and related_id in column
+    ]
+    rows, cols, data = zip(*pairs) if pairs else ((), (), ())
+    similarity = sparse.csr_matrix((data, (rows, cols)), shape=(len(published), len(published)), dtype=np.float32)
+
+    # P: popularity prior per subject, log-scaled and normalised to [0, 1]
+    subject_ids = sorted({subject_id for subject_id in subject_of.values() if subject_id is not None})
+    subject_row = {subject_id: index for index, subject_id in enumerate(subject_ids)}
+    view_counts = dict(VideoContent.objects.filter(is_published=True).values_list('id', 'view_count'))
+    prior_rows, prior_cols, prior_data = [], [], []
+    for video_id, index in column.items():
+        subject_id = subject_of.get(video_id)
+        if subject_id is not None:
+            prior_rows.append(subject_row[subject_id])
+            prior_cols.append(index)
+            prior_data.append(np.log1p(view_counts.get(video_id, 0)))
+    prior = sparse.csr_matrix(
+        (prior_data, (prior_rows, prior_cols)), shape=(max(len(subject_ids), 1), len(published)), dtype=np.float32
+    )
+    if prior.nnz:
+        prior.data /= prior.data.max() or 1.0
+
+    processed = 0
+    user_ids = list(active_students().values_list('user_id', flat=True))
+    for start in range(0, len(user_ids), STUDENT_CHUNK_SIZE):
+        chunk = user_ids[start:start + STUDENT_CHUNK_SIZE]
+        processed += _build_chunk(chunk, column, subject_row, similarity, prior, published, limit)
+    return processed
+
+
+def _build_chunk(user_ids, column, subject_row, similarity, prior, published, limit):
+    import numpy as np
+    from scipy import sparse
+
+    row_of = {user_id: index for index, user_id in enumerate(user_ids)}
+    shape = (len(user_ids), len(published))
+
+    def interactions(pairs, weight):
+        entries = [(row_of[user_id], column[video_id]) for user_id, video_id in pairs if video_id in column]
+        rows, cols = zip(*entries) if entries else ((), ())
+        matrix = sparse.csr_matrix((np.full(len(rows), weight, dtype=np.float32), (rows, cols)), shape=shape)
+        matrix.data[:] = weight
+        return matrix
+
+    watched = interactions(
+        VideoView.objects.filter(user_id__in=user_ids).values_list('user_id', 'video_id').iterator(), WATCHED_WEIGHT
+    )
+    saved = interactions(
+        UserProfile.saved_videos.through.objects.filter(userprofile__user_id__in=user_ids).values_list(
+            'userprofile__user_id', 'videocontent_id'
+        ).iterator(),
+        SAVED_WEIGHT,
+    )
+    enrolled_pairs = [
+        (row_of[user_id], subject_row[subject_id])
+        for user_id, subject_id in UserProfile.subjects.through.objects.filter(
+            userprofile__user_id__in=user_ids
+        ).values_list('userprofile__user_id', 'subject_id').iterator()
+        if subject_id in subject_row
+    ]
+    rows, cols = zip(*enrolled_pairs) if enrolled_pairs else ((), ())
+    enrolled = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(user_ids), prior.shape[0])
+    )
+
+    history = watched.maximum(saved)
+    scores = (history @ similarity + SUBJECT_WEIGHT * (enrolled @ prior)).toarray()
+    # Never recommend what the student has already watched or saved
+    scores[history.nonzero()] = 0.0
+
+    entries = []
+    for user_id, row in row_of.items():
+        candidates = np.flatnonzero(scores[row] > 0)
+        if not len(candidates):
+            continue
+        best = candidates[np.argsort(-scores[row, candidates], kind='stable')[:limit]]
+        entries.extend(
+            RecommendedVideo(user_id=user_id, video_id=int(published[index]), rank=rank, score=float(scores[row, index]))
+            for rank, index in enumerate(best)
+        )
+
+    with transaction.atomic():
+        RecommendedVideo.objects.filter(user_id__in=user_ids).delete()
+        RecommendedVideo.objects.bulk_create(entries, batch_size=1000)
+    return len(user_ids)
@@ -0,0 +1,170 @@
+"""
+"Viewers also watched" related videos, built offline from VideoView history.
+
+``build_related_videos()`` turns the (viewer, video) pairs into a sparse
+viewer x video matrix X, computes co-view counts C = X^T X with SciPy, scores
+them with cosine similarity and stores the top-K neighbours per video in the
+RelatedVideo table. Incremental runs only recompute the rows of videos watched
+by someone who has new views since the last watermark; rows left alone keep
+the audience sizes they were normalised with, so an occasional ``--full`` run
+refreshes those scores. The detail views then answer
+"related videos" with a single indexed lookup via ``related_videos_for()``.
+
+NumPy and SciPy are only needed by the batch job (``manage.py
+build_related_videos``), never by the web processes.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, Subquery
+
+from .models import ProcessingWatermark, RelatedVideo, VideoContent, VideoView
+from .sampling import sample_published_videos
+
+WATERMARK_NAME = 'related_videos'
+COUNT_CHUNK_SIZE = 500
+
+
+def related_videos_for(video, limit=4):
+    """Precomputed neighbours of ``video``, padded with random same-subject videos."""
+    entries = RelatedVideo.objects.filter(
+        video=video, related__is_published=True
+    ).select_related('related__teacher', 'related__subject')[:limit]
+    related = [entry.related for entry in entries]
+    if len(related) < limit:
+        exclude = [video.id] + [item.id for item in related]
+        related += sample_published_videos(limit - len(related), subject=video.subject_id, exclude=exclude)
+    return related
+
+
+def _same_viewers(views):
+    """Q matching every view made by a viewer (user or anonymous session) that appears in ``views``."""
+    return (
+        Q(user_id__in=Subquery(views.filter(user__isnull=False).values('user_id'))) |
+        Q(user__isnull=True, session_key__in=Subquery(
+            views.filter(user__isnull=True).exclude(session_key='').values('session_key')
+        ))
+    )
+
+
+def _viewer_rows(views):
+    """(viewer key, video id) pairs; logged-in users and anonymous sessions are distinct viewers."""
+    rows = views.exclude(user__isnull=True, session_key='').values_list('user_id', 'session_key', 'video_id')
+    keys, video_ids = [], []
+    for user_id, session_key, video_id in rows.iterator(chunk_size=10000):
+        keys.append(f"u{user_id}" if user_id is not None else f"s{session_key}")
+        video_ids.append(video_id)
+    return keys, video_ids
+
+
+def _view_counts(video_ids):
+    """Number of distinct viewers per video, fetched in chunks."""
+    counts = {}
+    video_ids = list(video_ids)
+    for start in range(0, len(video_ids), COUNT_CHUNK_SIZE):
+        chunk = video_ids[start:start + COUNT_CHUNK_SIZE]
+        rows = VideoView.objects.filter(video_id__in=chunk).exclude(
+            user__isnull=True, session_key=''
+        ).values('video_id').annotate(
+            viewers=Count('user_id', distinct=True) + Count('session_key', distinct=True, filter=Q(user__isnull=True))
+        ).values_list('video_id', 'viewers')
+        counts.update(rows)
+    return counts
+
+
+def build_related_videos(full=False, top_k=None):
+    """
+    Recompute neighbour lists. Returns the number of videos whose lists were
+    rebuilt. With ``full=False`` only videos viewed since the last run are
+    reprocessed.
+    """
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as exc:
+        raise RuntimeError('Building related videos requires numpy and scipy') from exc
+
+    top_k = top_k or settings.RELATED_VIDEOS_TOP_K
+    watermark, _ = ProcessingWatermark.objects.get_or_create(name=WATERMARK_NAME)
+    high_water = VideoView.objects.aggregate(high_water=Max('id'))['high_water'] or 0
+    if high_water <= watermark.last_id and not full:
+        return 0
+
+    if full or watermark.last_id == 0:
+        views = VideoView.objects.filter(id__lte=high_water)
+        affected = None
+    else:
+        history = VideoView.objects.filter(id__lte=high_water)
+        new_views = history.filter(id__gt=watermark.last_id)
+        # A new view changes the co-view counts of every video its viewer has watched
+        changed = history.filter(_same_viewers(new_views))
+        affected = set(changed.values_list('video_id', flat=True).distinct())
+        # Rebuilding those rows needs the full history of everyone who watched them
+        touched = history.filter(video_id__in=Subquery(changed.values('video_id')))
+        views = history.filter(_same_viewers(touched))
+
+    keys, video_ids = _viewer_rows(views)
+    if not keys:
+        _advance(watermark, high_water)
+        return 0
+
+    # Map viewers and videos onto dense matrix indexes
+    viewer_index = np.unique(np.array(keys, dtype=object), return_inverse=True)[1]
+    columns, video_index = np.unique(np.array(video_ids, dtype=np.int64), return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(keys), dtype=np.float32), (viewer_index, video_index)),
+        shape=(viewer_index.max() + 1, len(columns)),
+    )
+    # Repeat views by the same viewer count once
+    matrix.data[:] = 1.0
+
+    if affected is None:
+        rows = np.arange(len(columns))
+    else:
+        rows = np.flatnonzero(np.isin(columns, np.fromiter(affected, dtype=np.int64)))
+
+    # Co-view counts for the rows we are rebuilding: C[r, j] = viewers of both r and j
+    co_views = (matrix[:, rows].T @ matrix).tocsr()
+
+    # Cosine normalisation needs each video's total audience, not just the sample's
+    if affected is None:
+        audience = np.asarray(matrix.sum(axis=0)).ravel()
+    else:
+        counts = _view_counts(columns.tolist())
+        audience = np.array([counts.get(int(video_id), 0) for video_id in columns], dtype=np.float32)
+    audience = np.maximum(audience, 1.0)
+
+    entries = []
+    for position, row in enumerate(rows):
+        start, end = co_views.indptr[position], co_views.indptr[position + 1]
+        neighbours = co_views.indices[start:end]
+        counts = co_views.data[start:end]
+        keep = neighbours != row
+        neighbours, counts = neighbours[keep], counts[keep]
+        if not len(neighbours):
+            continue
+        scores = counts / np.sqrt(audience[row] * audience[neighbours])
+        best = np.argsort(-scores, kind='stable')[:top_k]
+        video_id = int(columns[row])
+        entries.extend(
+            RelatedVideo(video_id=video_id, related_id=int(columns[neighbours[i]]), rank=rank, score=float(scores[i]))
+            for rank, i in enumerate(best)
+        )
+
+    rebuilt = [int(columns[row]) for row in rows]
+    # Videos deleted since the views were read would violate the foreign keys
+    existing = set(VideoContent.objects.values_list('id', flat=True))
+    entries = [entry for entry in entries if entry.video_id in existing and entry.related_id in existing]
+    with transaction.atomic():
+        if affected is None:
+            RelatedVideo.objects.all().delete()
+        else:
+            for start in range(0, len(rebuilt), COUNT_CHUNK_SIZE):
+                RelatedVideo.objects.filter(video_id__in=rebuilt[start:start + COUNT_CHUNK_SIZE]).delete()
+        RelatedVideo.objects.bulk_create(entries, batch_size=1000)
+        _advance(watermark, high_water)
+    return len(rebuilt)
+
+
+def _advance(watermark, high_water):
+    watermark.last_id = high_water
+    watermark.save(update_fields=['last_id', 'updated_at'])
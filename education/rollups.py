@@ -0,0 +1,127 @@
+"""
+Daily view rollups for the teacher analytics.
+
+VideoDailyStats and TeacherDailyStats hold, per video and per teacher per
+day, the number of VideoView rows, distinct signed-in viewers and distinct
+anonymous sessions. Dashboards read these instead of counting raw views.
+
+``build_rollups()`` works from a watermark on VideoView ids: it finds the days
+that received rows since the last run and recomputes those days from the raw
+rows. Recomputing whole days (rather than adding deltas) keeps the distinct
+counts exact, and only ever reads one day of history at a time.
+
+The view_events writer thread calls ``build_if_due()`` after each batch, so
+the rollups trail the raw rows by at most VIEW_ROLLUP_INTERVAL. Workers claim
+an interval with a conditional UPDATE of the watermark row's updated_at, which
+the database applies atomically, so one worker per interval does the work.
+start.sh also runs ``manage.py build_view_rollups`` on boot.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ProcessingWatermark, TeacherDailyStats, VideoDailyStats, VideoView
+
+WATERMARK_NAME = 'view_rollups'
+
+AGGREGATES = {
+    'views': Count('id'),
+    'unique_users': Count('user', distinct=True),
+    'anonymous_sessions': Count('session_key', distinct=True, filter=Q(user__isnull=True) & ~Q(session_key='')),
+}
+
+
+def _day_range(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _rollup_day(day, high_water):
+    start, end = _day_range(day)
+    views = VideoView.objects.filter(created_at__gte=start, created_at__lt=end, id__lte=high_water).order_by()
+    per_video = views.values('video_id').annotate(**AGGREGATES)
+    per_teacher = views.values('video__teacher').annotate(**AGGREGATES)
+
+    with transaction.atomic():
+        VideoDailyStats.objects.filter(day=day).delete()
+        VideoDailyStats.objects.bulk_create([
+            VideoDailyStats(video_id=row.pop('video_id'), day=day, **row) for row in per_video
+        ])
+        TeacherDailyStats.objects.filter(day=day).delete()
+        TeacherDailyStats.objects.bulk_create([
+            TeacherDailyStats(teacher_id=row.pop('video__teacher'), day=day, **row) for row in per_teacher
+        ])
+
+
+def build_rollups(full=False):
+    """Bring the daily rollups up to date. Returns the number of days recomputed."""
+    watermark, _ = ProcessingWatermark.objects.get_or_create(name=WATERMARK_NAME)
+    high_water = VideoView.objects.aggregate(high_water=Max('id'))['high_water'] or 0
+    low_water = 0 if full else watermark.last_id
+    if high_water <= low_water:
+        return 0
+
+    days = (
+        VideoView.objects.filter(id__gt=low_water, id__lte=high_water).order_by()
+        .annotate(day=TruncDate('created_at')).values_list('day', flat=True).distinct()
+    )
+    days = sorted(days)
+    if full:
+        # Days whose views have all been deleted would otherwise be left behind
+        TeacherDailyStats.objects.all().delete()
+        VideoDailyStats.objects.all().delete()
+    for day in days:
+        _rollup_day(day, high_water)
+
+    watermark.last_id = high_water
+    watermark.save(update_fields=['last_id', 'updated_at'])
+    return len(days)
+
+
+def build_if_due():
+    """build_rollups() unless some worker already started one in the last VIEW_ROLLUP_INTERVAL."""
+    now = timezone.now()
+    watermark, created = ProcessingWatermark.objects.get_or_create(name=WATERMARK_NAME)
+    if not created:
+        # Only one UPDATE can move updated_at past the interval; the others match no row
+        claimed = ProcessingWatermark.objects.filter(
+            pk=watermark.pk, updated_at__lte=now - timedelta(seconds=settings.VIEW_ROLLUP_INTERVAL),
+        ).update(updated_at=now)
+        if not claimed:
+            return None
+    return build_rollups()
+
+
+def teacher_totals(teacher):
+    totals = TeacherDailyStats.objects.filter(teacher=teacher).aggregate(
+        views=Sum('views'), anonymous_sessions=Sum('anonymous_sessions'),
+    )
+    return {name: value or 0 for name, value in totals.items()}
+
+
+def video_totals(video_ids):
+    """``{video_id: views}`` for the given videos."""
+    return dict(
+        VideoDailyStats.objects.filter(video_id__in=video_ids).order_by().values('video_id')
+        .annotate(total=Sum('views')).values_list('video_id', 'total')
+    )
+
+
+def teacher_daily_series(teacher, days=30):
+    """``[{'day': 'YYYY-MM-DD', 'views': n, 'unique_users': n}, ...]`` for the last ``days`` days, gaps filled with 0."""
+    today = timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    rows = {
+        row['day']: row for row in TeacherDailyStats.objects.filter(teacher=teacher, day__gte=first)
+        .values('day', 'views', 'unique_users')
+    }
+    series = []
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        row = rows.get(day, {})
+        series.append({'day': day.isoformat(), 'views': row.get('views', 0), 'unique_users': row.get('unique_users', 0)})
+    return series
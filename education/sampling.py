@@ -0,0 +1,75 @@
+"""
+Random selection of published videos without ORDER BY RANDOM().
+
+The ids of published videos (overall, per subject, and for videos without a
+subject) are cached as compact arrays. Picking N random videos is then N
+random indexes into the array plus one in_bulk() lookup, however large the
+catalogue grows. The arrays live in each worker's default cache; their keys
+carry a version number kept in the 'shared' cache, as in homepage_cache. Any
+video save or delete bumps that version, which retires every worker's arrays
+at once.
+"""
+import random
+import time
+from array import array
+
+from django.core.cache import cache, caches
+
+from .metrics import record_cache
+
+VERSION_KEY = 'sampling:version'
+IDS_TIMEOUT = 60 * 60
+# Default for ``subject``: sample the whole catalogue. None means "no subject".
+ALL_SUBJECTS = 'all'
+
+
+def _ids_key(subject_id):
+    shared = caches['shared']
+    version = shared.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost version never brings back old arrays
+        shared.add(VERSION_KEY, time.time_ns())
+        version = shared.get(VERSION_KEY)
+    return f"sampling:ids:v{version}:{'none' if subject_id is None else subject_id}"
+
+
+def published_video_ids(subject_id=ALL_SUBJECTS):
+    """Return an array of published video ids, optionally for one subject (None: no subject)."""
+    from .models import VideoContent
+
+    key = _ids_key(subject_id)
+    ids = cache.get(key)
+    record_cache('sampling', ids is not None)
+    if ids is None:
+        queryset = VideoContent.objects.filter(is_published=True)
+        if subject_id != ALL_SUBJECTS:
+            # subject_id=None is an IS NULL filter
+            queryset = queryset.filter(subject_id=subject_id)
+        ids = array('q', queryset.order_by().values_list('id', flat=True))
+        cache.set(key, ids, IDS_TIMEOUT)
+    return ids
+
+
+def sample_published_videos(n, subject=ALL_SUBJECTS, exclude=(), queryset=None):
+    """Return up to ``n`` distinct random published videos in random order."""
+    from .models import VideoContent
+
+    subject_id = getattr(subject, 'pk', subject)
+    ids = published_video_ids(subject_id)
+    exclude = set(exclude)
+
+    # Draw a few extra positions to make up for excluded ids
+    positions = random.sample(range(len(ids)), min(len(ids), n + len(exclude)))
+    chosen = [ids[position] for position in positions if ids[position] not in exclude][:n]
+
+    if queryset is None:
+        queryset = VideoContent.objects.select_related('teacher', 'subject')
+    # Re-check publication in case the cached ids are a little stale
+    videos = queryset.filter(is_published=True).in_bulk(chosen)
+    return [videos[video_id] for video_id in chosen if video_id in videos]
+
+
+def invalidate():
+    shared = caches['shared']
+    shared.add(VERSION_KEY, time.time_ns())
+    shared.incr(VERSION_KEY)
@@ -0,0 +1,215 @@
+"""
+Per-user cache of saved video and note ids, used to render "saved" badges.
+
+Each profile's saved ids are cached as one sorted array in the shared cache
+(so every worker sees the same one), loaded with a single query on first
+use. Membership for a whole page of cards is answered from that array with
+bisect, without touching the database. The array's key carries a
+per-profile version number, and any write bumps it: m2m_changed on
+UserProfile.saved_videos / saved_notes covers the admin, forms and the
+shell, and the functions below cover their own direct writes to the through
+table. A reader that loaded the ids just before a write stores them under
+the version it read, which nobody asks for once the version has moved on,
+so a stale array is never served.
+
+Writes never trust the cache. A toggle is a DELETE whose row count says
+whether the video was saved, followed by an INSERT only if nothing was
+deleted. Saving checks publication against VideoContent in the same call
+rather than the sampling id cache, which can be an hour old on other workers.
+"""
+import time
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache, caches
+from django.db import transaction
+
+from .models import UserProfile, VideoContent
+from .profiles import loaded_profile
+
+VIDEOS = 'videos'
+NOTES = 'notes'
+THROUGH = {
+    VIDEOS: (UserProfile.saved_videos.through, 'videocontent_id'),
+    NOTES: (UserProfile.saved_notes.through, 'note_id'),
+}
+TIMEOUT = 60 * 60
+
+
+def _sets():
+    return caches['shared']
+
+
+def _version_key(profile_id, kind):
+    return f'saved:{kind}:{profile_id}:version'
+
+
+def _key(profile_id, kind):
+    sets = _sets()
+    version = sets.get(_version_key(profile_id, kind))
+    if version is None:
+        # Start from the clock so a lost version never brings back an old array
+        sets.add(_version_key(profile_id, kind), time.time_ns(), None)
+        version = sets.get(_version_key(profile_id, kind))
+    return f'saved:{kind}:{profile_id}:v{version}'
+
+
+def _profile_key(user_id):
+    return f'saved:profile:{user_id}'
+
+
+def profile_id_for(user):
+    """The user's UserProfile id, cached; None if they have no profile."""
+    profile = loaded_profile(user)
+    if profile is not None:
+        return profile.pk
+    key = _profile_key(user.pk)
+    profile_id = cache.get(key)
+    if profile_id is None:
+        profile_id = UserProfile.objects.filter(user=user).values_list('id', flat=True).first()
+        if profile_id is not None:
+            cache.set(key, profile_id, TIMEOUT)
+    return profile_id
+
+
+def saved_ids(profile_id, kind=VIDEOS):
+    """Sorted array of the ids ``profile_id`` has saved."""
+    key = _key(profile_id, kind)
+    ids = _sets().get(key)
+    if ids is None:
+        through, column = THROUGH[kind]
+        ids = array('q', through.objects.filter(userprofile_id=profile_id).order_by(column).values_list(
+            column, flat=True
+        ))
+        _sets().set(key, ids, TIMEOUT)
+    return ids
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def saved_among(user, object_ids, kind=VIDEOS):
+    """The subset of ``object_ids`` the user has saved (an empty set for anonymous users)."""
+    if not user.is_authenticated:
+        return set()
+    profile_id = profile_id_for(user)
+    if profile_id is None:
+        return set()
+    ids = saved_ids(profile_id, kind)
+    return {object_id for object_id in object_ids if _contains(ids, object_id)}
+
+
+def is_saved(user, object_id, kind=VIDEOS):
+    return object_id in saved_among(user, [object_id], kind)
+
+
+def _bump(profile_ids, kind):
+    sets = _sets()
+    for profile_id in profile_ids:
+        sets.add(_version_key(profile_id, kind), time.time_ns(), None)
+        sets.incr(_version_key(profile_id, kind))
+
+
+def invalidate(profile_ids, kind=VIDEOS):
+    profile_ids = list(profile_ids)
+    _bump(profile_ids, kind)
+    # m2m_changed fires before the write commits, and a reader in between
+    # still sees the old rows; bump again once they are visible
+    transaction.on_commit(lambda: _bump(profile_ids, kind))
+
+
+def set_saved(profile_id, object_ids, saved, kind=VIDEOS):
+    """Save or unsave ``object_ids`` with one statement. Unsaving returns the number of rows deleted."""
+    through, column = THROUGH[kind]
+    deleted = 0
+    if saved:
+        through.objects.bulk_create(
+            [through(userprofile_id=profile_id, **{column: object_id}) for object_id in object_ids],
+            ignore_conflicts=True,
+        )
+    else:
+        deleted, _ = through.objects.filter(userprofile_id=profile_id, **{f'{column}__in': object_ids}).delete()
+    if saved or deleted:
+        invalidate([profile_id], kind)
+    return deleted
+
+
+def published(video_ids):
+    """The subset of ``video_ids`` that are published videos, from the database."""
+    if not video_ids:
+        return []
+    return sorted(VideoContent.objects.filter(id__in=video_ids, is_published=True).values_list('id', flat=True))
+
+
+def save_videos(user, save=(), unsave=()):
+    """
+    Save and unsave published videos for ``user``. Ids of unknown or
+    unpublished videos are ignored. Returns ``(saved, unsaved)`` id lists,
+    or None if the user has no profile.
+    """
+    profile_id = profile_id_for(user)
+    if profile_id is None:
+        return None
+    save = published(set(save))
+    unsave = sorted(set(unsave) - set(save))
+    if save:
+        set_saved(profile_id, save, True)
+    if unsave:
+        set_saved(profile_id, unsave, False)
+    return save, unsave
+
+
+def requested_state(request):
+    """The state a toggle request asks for (``saved=1/0``, for clients that know it), or None to flip it."""
+    value = request.POST.get('saved')
+    if value is None:
+        return None
+    return value.lower() in ('1', 'true', 'on')
+
+
+def toggle_video(user, video_id, saved=None):
+    """
+    Flip (or, with ``saved`` given, set) whether the user has saved a
+    video. Returns the new state, or None if saving was asked for but the
+    video is not published, or the user has no profile.
+    """
+    profile_id = profile_id_for(user)
+    if profile_id is None:
+        return None
+    if saved is None:
+        # The DELETE's row count is the current state; only save if nothing was removed
+        if set_saved(profile_id, [video_id], False):
+            return False
+        saved = True
+    if not saved:
+        set_saved(profile_id, [video_id], False)
+        return False
+    if not published([video_id]):
+        return None
+    set_saved(profile_id, [video_id], True)
+    return True
+
+
+def relation_changed(instance, action, reverse, pk_set, kind):
+    """m2m_changed handler for saved_videos / saved_notes (see models.py)."""
+    if action == 'pre_clear' and reverse:
+        # pk_set is not sent for clear(); remember who is affected before the rows go
+        through, column = THROUGH[kind]
+        instance._saved_set_profiles = list(
+            through.objects.filter(**{column: instance.pk}).values_list('userprofile_id', flat=True)
+        )
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            invalidate([instance.pk], kind)
+        elif action == 'post_clear':
+            invalidate(getattr(instance, '_saved_set_profiles', ()), kind)
+        else:
+            invalidate(pk_set or (), kind)
+
+
+def profile_deleted(profile):
+    cache.delete(_profile_key(profile.user_id))
+    # Without a version the next one starts from the clock, past every old array
+    _sets().delete_many([_version_key(profile.pk, VIDEOS), _version_key(profile.pk, NOTES)])
@@ -0,0 +1,319 @@
+"""
+Full-text search over published videos, public notes and approved teachers.
+
+The default backend stores one row per document in an SQLite FTS5 virtual
+table (created by migration 0007) and ranks matches with bm25(). Another
+backend can be plugged in through the SEARCH_BACKEND setting; SimpleBackend
+falls back to icontains filters for databases without FTS5. The index is kept
+current by receivers in models.py; ``manage.py rebuild_search_index`` rebuilds
+it from scratch.
+"""
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+
+from .pagination import InvalidCursor
+
+TABLE = 'education_search_index'
+KINDS = ('video', 'note', 'teacher')
+
+# Saves that only touch these fields never change a search document
+IGNORED_FIELDS = {'view_count', 'processing_status', 'hls_manifest', 'published_video_count'}
+
+# Private-use markers survive FTS highlighting and HTML escaping untouched
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+
+Document = namedtuple('Document', 'kind object_id title body')
+# sort_key orders hits within a backend and is what keyset cursors store
+SearchHit = namedtuple('SearchHit', 'kind object_id title snippet sort_key')
+
+
+def document_for(instance):
+    """
+    Return the Document for a model instance, or None when it should not be
+    searchable (unpublished video, private note, unapproved teacher...).
+    """
+    label = instance._meta.label
+    if label == 'education.VideoContent':
+        if not instance.is_published:
+            return None
+        return Document('video', instance.pk, instance.title, instance.description)
+    if label == 'education.Note':
+        if not instance.is_public:
+            return None
+        return Document('note', instance.pk, instance.title, instance.content)
+    if label == 'education.UserProfile':
+        if instance.role != 'teacher' or not instance.is_approved:
+            return None
+        user = instance.user
+        name = user.get_full_name() or user.username
+        body = ' '.join(filter(None, [user.username, instance.qualification, instance.bio]))
+        return Document('teacher', instance.pk, name, body)
+    return None
+
+
+def kind_for(instance):
+    return {
+        'education.VideoContent': 'video',
+        'education.Note': 'note',
+        'education.UserProfile': 'teacher',
+    }.get(instance._meta.label)
+
+
+def rowid_for(kind, object_id):
+    # FTS5 can only look rows up efficiently by rowid, so encode (kind, id) in it
+    return object_id * len(KINDS) + KINDS.index(kind)
+
+
+def split_rowid(rowid):
+    return KINDS[rowid % len(KINDS)], rowid // len(KINDS)
+
+
+def highlight(text):
+    """Escape ``text`` and turn the match markers into <mark> tags."""
+    return escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+class BaseSearchBackend:
+    def index(self, document):
+        raise NotImplementedError
+
+    def remove(self, kind, object_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def count(self, query, kinds=KINDS):
+        raise NotImplementedError
+
+    def search(self, query, kinds=KINDS, offset=0, limit=20, after=None, reverse=False):
+        """
+        Return a list of SearchHit, best match first. ``after`` is the sort_key
+        of the last hit already shown; with ``reverse`` the hits before it are
+        returned, worst match first.
+        """
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    @staticmethod
+    def to_match_query(query):
+        # Quote every term so user input can never be parsed as FTS syntax;
+        # the trailing * lets "pyth" match "python"
+        terms = re.findall(r'\w+', query)
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def index(self, document):
+        rowid = rowid_for(document.kind, document.object_id)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [rowid])
+            cursor.execute(
+                f"INSERT INTO {TABLE} (rowid, kind, title, body) VALUES (%s, %s, %s, %s)",
+                [rowid, document.kind, document.title, document.body or ''],
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [rowid_for(kind, object_id)])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE}")
+
+    def _where(self, query, kinds):
+        placeholders = ', '.join(['%s'] * len(kinds))
+        return f"{TABLE} MATCH %s AND kind IN ({placeholders})", [self.to_match_query(query), *kinds]
+
+    def count(self, query, kinds=KINDS):
+        if not self.to_match_query(query):
+            return 0
+        where, params = self._where(query, kinds)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {TABLE} WHERE {where}", params)
+            return cursor.fetchone()[0]
+
+    def search(self, query, kinds=KINDS, offset=0, limit=20, after=None, reverse=False):
+        if not self.to_match_query(query):
+            return []
+        where, params = self._where(query, kinds)
+        sql = (
+            f"SELECT rowid, title, snippet, score FROM ("
+            f"SELECT rowid, "
+            f"highlight({TABLE}, 1, %s, %s) AS title, "
+            f"snippet({TABLE}, 2, %s, %s, '…', 16) AS snippet, "
+            # Title matches weigh more than body matches
+            f"bm25({TABLE}, 0.0, 5.0, 1.0) AS score "
+            f"FROM {TABLE} WHERE {where})"
+        )
+        params = [MARK_START, MARK_END, MARK_START, MARK_END, *params]
+        if after is not None:
+            # Continue from (score, rowid) of the last hit shown
+            op = '<' if reverse else '>'
+            sql += f" WHERE score {op} %s OR (score = %s AND rowid {op} %s)"
+            params += [after[0], after[0], after[1]]
+        direction = 'DESC' if reverse else 'ASC'
+        sql += f" ORDER BY score {direction}, rowid {direction} LIMIT %s OFFSET %s"
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, limit, offset])
+            rows = cursor.fetchall()
+        return [
+            SearchHit(*split_rowid(rowid), highlight(title), highlight(snippet), (score, rowid))
+            for rowid, title, snippet, score in rows
+        ]
+
+
+class SimpleBackend(BaseSearchBackend):
+    """Index-less fallback that filters the models directly with icontains."""
+
+    def index(self, document):
+        pass
+
+    def remove(self, kind, object_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def _querysets(self, query, kinds):
+        from django.db.models import Q
+        from .models import Note, UserProfile, VideoContent
+
+        querysets = {
+            'video': VideoContent.objects.filter(is_published=True).filter(
+                Q(title__icontains=query) | Q(description__icontains=query)
+            ),
+            'note': Note.objects.filter(is_public=True).filter(
+                Q(title__icontains=query) | Q(content__icontains=query)
+            ),
+            'teacher': UserProfile.objects.filter(role='teacher', is_approved=True).filter(
+                Q(user__first_name__icontains=query) | Q(user__last_name__icontains=query) |
+                Q(user__username__icontains=query) | Q(bio__icontains=query)
+            ).select_related('user'),
+        }
+        return [(kind, querysets[kind]) for kind in kinds]
+
+    def count(self, query, kinds=KINDS):
+        if not query.strip():
+            return 0
+        return sum(queryset.count() for _, queryset in self._querysets(query, kinds))
+
+    def search(self, query, kinds=KINDS, offset=0, limit=20, after=None, reverse=False):
+        if not query.strip():
+            return []
+        # Hits are ordered by (kind, pk), which is also their sort_key
+        querysets = self._querysets(query, kinds)
+        if reverse:
+            querysets.reverse()
+        hits = []
+        for kind, queryset in querysets:
+            position = KINDS.index(kind)
+            if after is not None:
+                if (position < after[0]) != reverse and position != after[0]:
+                    continue
+                if position == after[0]:
+                    queryset = queryset.filter(**{'pk__lt' if reverse else 'pk__gt': after[1]})
+            queryset = queryset.order_by('-pk' if reverse else 'pk')
+            for instance in queryset[:offset + limit - len(hits)]:
+                document = document_for(instance)
+                hits.append(SearchHit(
+                    kind, instance.pk, escape(document.title), escape((document.body or '')[:200]),
+                    (position, instance.pk),
+                ))
+            if len(hits) >= offset + limit:
+                break
+        return hits[offset:offset + limit]
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.SEARCH_BACKEND)()
+    return _backend
+
+
+def update_index(instance):
+    """Index ``instance`` or drop it from the index if it is no longer searchable."""
+    document = document_for(instance)
+    if document is None:
+        get_backend().remove(kind_for(instance), instance.pk)
+    else:
+        get_backend().index(document)
+
+
+def remove_from_index(instance):
+    get_backend().remove(kind_for(instance), instance.pk)
+
+
+class SearchResults:
+    """
+    Lazy sequence over a search so it can be handed to Paginator or
+    KeysetPaginator: only the requested page is fetched, and hits are
+    resolved to model instances in one query per kind.
+    """
+
+    def __init__(self, query, kinds=KINDS):
+        self.query = query
+        self.kinds = kinds
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = get_backend().count(self.query, self.kinds)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        hits = get_backend().search(self.query, self.kinds, offset=start, limit=max(stop - start, 0))
+        return resolve_hits(hits)
+
+    # Keyset source interface, see pagination.KeysetPaginator
+
+    @property
+    def signature(self):
+        return f"search:{','.join(self.kinds)}:{self.query}"
+
+    def key(self, item):
+        return list(item[0].sort_key)
+
+    def parse(self, values):
+        if len(values) != 2:
+            raise InvalidCursor('Cursor does not match the ordering')
+        return values
+
+    def fetch(self, boundary, reverse, limit):
+        return resolve_hits(get_backend().search(self.query, self.kinds, limit=limit, after=boundary, reverse=reverse))
+
+
+def resolve_hits(hits):
+    """Attach the model instance to every hit as ``(hit, instance)`` pairs, dropping stale ones."""
+    from .models import Note, UserProfile, VideoContent
+
+    querysets = {
+        'video': VideoContent.objects.select_related('teacher', 'subject'),
+        'note': Note.objects.select_related('subject', 'video'),
+        'teacher': UserProfile.objects.select_related('user'),
+    }
+    instances = {}
+    for kind in {hit.kind for hit in hits}:
+        ids = [hit.object_id for hit in hits if hit.kind == kind]
+        instances[kind] = querysets[kind].in_bulk(ids)
+    return [
+        (hit, instances[hit.kind][hit.object_id])
+        for hit in hits
+        if hit.object_id in instances[hit.kind]
+    ]
@@ -0,0 +1,24 @@
+from django.shortcuts import render
+
+from .pagination import paginate
+from .search import KINDS, SearchResults
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('type', '')
+    kinds = (kind,) if kind in KINDS else KINDS
+    
+    # Only the requested page is fetched from the index; the total is one
+    # COUNT(*) over the index for the results line
+    search_results = SearchResults(query, kinds)
+    results = paginate(request, search_results, 20)
+    
+    context = {
+        'query': query,
+        'selected_type': kind if kind in KINDS else '',
+        'types': KINDS,
+        'results': results,
+        'result_count': search_results.count(),
+    }
+    return render(request, 'education/search.html', context)
@@ -0,0 +1,206 @@
+"""
+Video delivery with HTTP Range support.
+
+Files are handed to the WSGI server through FileResponse so gunicorn can use
+os.sendfile() for the body. When VIDEO_OFFLOAD_MODE is set, Django only does
+the access check and lets the front proxy serve the bytes. HLS playlists and
+segments go through the same access check as the uploaded file.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_http_methods
+
+from .models import VideoContent
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# mimetypes does not know these everywhere (.ts is often a Qt translation file)
+HLS_CONTENT_TYPES = {'.m3u8': 'application/vnd.apple.mpegurl', '.ts': 'video/mp2t'}
+
+
+class RangeFile:
+    """
+    Read-only view of ``length`` bytes of ``file`` starting at ``start``.
+
+    The underlying descriptor is left positioned at ``start`` and fileno() is
+    exposed, so a WSGI file_wrapper can sendfile() exactly Content-Length bytes.
+    Plain iteration (e.g. under runserver) is capped at ``length`` as well.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single byte range, None when the
+    header should be ignored, or raise ValueError when it is unsatisfiable.
+    Multi-range requests are ignored and answered with the full file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, min(end, size - 1)
+
+
+def make_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        # Strong comparison only; weak validators never match If-Range
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def offload_response(name, path, content_type):
+    """Let the front proxy serve a media file after Django has done the access check."""
+    mode = settings.VIDEO_OFFLOAD_MODE
+    response = HttpResponse(content_type=content_type)
+    if mode == 'x-accel-redirect':
+        prefix = settings.VIDEO_ACCEL_REDIRECT_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = f"{prefix}/{name}"
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = path
+    else:
+        raise ValueError(f"Unknown VIDEO_OFFLOAD_MODE: {mode!r}")
+    return response
+
+
+def serve_file(request, path, content_type):
+    """Conditional, Range-aware response for the file at ``path``."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise Http404('Video file is missing')
+
+    size = stat.st_size
+    etag = make_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    # 304 / 412 for If-None-Match, If-Modified-Since and friends
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+    elif byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(RangeFile(open(path, 'rb'), start, length), content_type=content_type)
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = length
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def accessible_video(request, pk):
+    # Published videos are public; drafts are visible to their teacher and staff
+    access = Q(is_published=True)
+    if request.user.is_authenticated:
+        access |= Q(teacher=request.user)
+        if request.user.is_staff:
+            access = Q()
+    return get_object_or_404(VideoContent.objects.filter(access), pk=pk)
+
+
+@require_http_methods(['GET', 'HEAD'])
+def stream_video(request, pk):
+    video = accessible_video(request, pk)
+    content_type = mimetypes.guess_type(video.video_file.name)[0] or 'application/octet-stream'
+    try:
+        path = video.video_file.path
+    except ValueError:
+        raise Http404('Video file is missing')
+    if settings.VIDEO_OFFLOAD_MODE:
+        return offload_response(video.video_file.name, path, content_type)
+    return serve_file(request, path, content_type)
+
+
+@require_http_methods(['GET', 'HEAD'])
+def stream_hls(request, pk, name):
+    """A playlist or segment from the video's HLS output directory."""
+    video = accessible_video(request, pk)
+    if not video.hls_ready:
+        raise Http404('Video has no HLS renditions')
+    directory = posixpath.dirname(video.hls_manifest)
+    try:
+        # Rejects names that climb out of the directory
+        path = safe_join(default_storage.path(directory), name)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid HLS file name')
+    if not os.path.isfile(path):
+        raise Http404('HLS file is missing')
+    content_type = (
+        HLS_CONTENT_TYPES.get(os.path.splitext(name)[1])
+        or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    )
+    if settings.VIDEO_OFFLOAD_MODE:
+        return offload_response(posixpath.join(directory, name), path, content_type)
+    return serve_file(request, path, content_type)
@@ -1,21 +1,27 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
 from django.contrib.auth.models import User
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
 from .models import UserProfile, TeacherProfile, Subject, VideoContent, Note
+from . import search, view_counter
+from .profiles import get_profile
+from .recommendations import recommended_videos_for
+from .related_videos import related_videos_for
+
+MAX_TEACHER_HITS = 500
 
 @login_required
 def student_dashboard(request):
-    if not request.user.profile.is_student:
-        return redirect('homepage')
+    profile = get_profile(request)
+    if profile is None or not profile.is_student:
+        return redirect('home')
     
     # Get recent videos
     recent_videos = VideoContent.objects.filter(is_published=True).order_by('-created_at')[:6]
     
-    # Get recommended videos (in a real app, this would be based on user's interests/behavior)
-    recommended_videos = VideoContent.objects.filter(is_published=True).order_by('?')[:4]
+    # Get recommended videos (precomputed from the student's history and subjects)
+    recommended_videos = recommended_videos_for(request.user, 4)
     
     # Get all subjects for the filter
     subjects = Subject.objects.all()
@@ -31,18 +37,15 @@ def search_teachers(request):
     query = request.GET.get('q', '')
     subject_id = request.GET.get('subject', '')
     
-    teachers = User.objects.filter(profile__role='teacher', teacher_profile__is_approved=True)
+    teachers = User.objects.filter(profile__role='teacher', profile__is_approved=True)
     
     if query:
-        teachers = teachers.filter(
-            Q(first_name__icontains=query) | 
-            Q(last_name__icontains=query) |
-            Q(username__icontains=query) |
-            Q(teacher_profile__bio__icontains=query)
-        )
+        # Full-text index instead of leading-wildcard LIKE scans
+        hits = search.get_backend().search(query, kinds=('teacher',), limit=MAX_TEACHER_HITS)
+        teachers = teachers.filter(profile__id__in=[hit.object_id for hit in hits])
     
     if subject_id:
-        teachers = teachers.filter(teacher_profile__subjects__id=subject_id)
+        teachers = teachers.filter(profile__subjects__id=subject_id)
     
     # Get all subjects for the filter
     subjects = Subject.objects.all()
@@ -84,14 +87,11 @@ def video_detail(request, video_id):
     video = get_object_or_404(VideoContent, id=video_id, is_published=True)
     
     # Increment view count
-    video.view_count += 1
-    video.save()
+    pending = view_counter.record_view(video.id)
+    video.view_count = view_counter.live_view_count(video, pending)
     
     # Get related videos (videos from the same subject)
-    related_videos = VideoContent.objects.filter(
-        subject=video.subject,
-        is_published=True
-    ).exclude(id=video.id).order_by('?')[:4]
+    related_videos = related_videos_for(video, 4)
     
     # Get notes for this video
     notes = Note.objects.filter(video=video)
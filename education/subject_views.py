@@ -1,17 +1,17 @@
 from django.views.generic import ListView, DetailView
-from django.db.models import Count, Q
 from .models import Subject, VideoContent
+from . import saved_sets
+from .pagination import KeysetPaginationMixin, paginate, video_sort
 
-class SubjectListView(ListView):
+class SubjectListView(KeysetPaginationMixin, ListView):
     model = Subject
     template_name = 'education/subject_list.html'
     context_object_name = 'subjects'
     paginate_by = 12
+    keyset_ordering = ('name', 'id')
     
     def get_queryset(self):
-        queryset = Subject.objects.annotate(
-            video_count=Count('videos', filter=Q(videos__is_published=True))
-        ).filter(video_count__gt=0).order_by('name')
+        queryset = Subject.objects.filter(published_video_count__gt=0).order_by('name')
         return queryset
     
     def get_context_data(self, **kwargs):
@@ -25,27 +25,26 @@ class SubjectDetailView(DetailView):
     context_object_name = 'subject'
     slug_url_kwarg = 'slug'
     
-    def get_queryset(self):
-        return Subject.objects.annotate(
-            video_count=Count('videos', filter=Q(videos__is_published=True))
-        )
-    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        subject = self.get_object()
+        subject = self.object
         
-        # Get published videos for this subject
-        videos = subject.videos.filter(is_published=True).select_related('teacher')
+        # Get one page of published videos for this subject
+        sort, ordering = video_sort(self.request)
+        videos = paginate(
+            self.request, subject.videos.filter(is_published=True).select_related('teacher'), 12, ordering
+        )
         
         # Get related subjects (excluding current subject)
         related_subjects = Subject.objects.filter(
-            category=subject.category
-        ).exclude(id=subject.id).annotate(
-            video_count=Count('videos', filter=Q(videos__is_published=True))
-        ).filter(video_count__gt=0)[:4]
+            published_video_count__gt=0
+        ).exclude(id=subject.id).order_by('-published_video_count')[:4]
         
         context.update({
             'videos': videos,
+            'sort': sort,
+            # Saved badges for the whole page from one cached set
+            'saved_video_ids': saved_sets.saved_among(self.request.user, [video.id for video in videos]),
             'related_subjects': related_subjects,
             'page_title': f"{subject.name} - Videos"
         })
@@ -0,0 +1,41 @@
+from django import template
+from django.utils.html import format_html
+
+from education import thumbnails
+
+register = template.Library()
+
+
+@register.filter
+def srcset(image, ext='webp'):
+    """``{{ video.thumbnail|srcset:"jpg" }}`` -> "…/320.jpg 320w, …/640.jpg 640w"."""
+    if not image:
+        return ''
+    return thumbnails.srcset(image.name, ext)
+
+
+@register.simple_tag
+def responsive_image(image, alt='', css_class='', sizes='100vw', fallback=''):
+    """
+    Render a <picture> with WebP and JPEG srcsets for an ImageField, falling
+    back to the original upload (or ``fallback``) until derivatives exist.
+    """
+    if not image:
+        if not fallback:
+            return ''
+        return format_html('<img src="{}" class="{}" alt="{}" loading="lazy">', fallback, css_class, alt)
+
+    webp = thumbnails.srcset(image.name, 'webp')
+    jpeg = thumbnails.srcset(image.name, 'jpg')
+    if not webp or not jpeg:
+        return format_html('<img src="{}" class="{}" alt="{}" loading="lazy">', image.url, css_class, alt)
+
+    # The smallest JPEG is the src for browsers without srcset support
+    src = jpeg.split(',')[0].rsplit(' ', 1)[0]
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" class="{}" alt="{}" loading="lazy">'
+        '</picture>',
+        webp, sizes, src, jpeg, sizes, css_class, alt,
+    )
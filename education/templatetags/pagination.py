@@ -0,0 +1,17 @@
+from django import template
+
+from education.pagination import CURSOR_PARAM
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """``?…&cursor=…`` for the current page, keeping the other query parameters."""
+    query = context['request'].GET.copy()
+    query.pop('page', None)
+    if cursor:
+        query[CURSOR_PARAM] = cursor
+    else:
+        query.pop(CURSOR_PARAM, None)
+    return f"?{query.urlencode()}"
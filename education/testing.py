@@ -0,0 +1,38 @@
+"""
+Test helpers.
+
+    from education.testing import assert_query_budget, enforce_query_budgets
+
+    with assert_query_budget(5):
+        list(VideoContent.objects.select_related('teacher'))
+
+    @enforce_query_budgets
+    class HomepageTests(TestCase):
+        ...  # every request made through self.client is checked
+
+Both fail on likely N+1 patterns as well as on the query count.
+"""
+from contextlib import contextmanager
+
+from django.test.utils import override_settings
+
+from .query_budget import QueryRecorder
+
+# Turn the middleware checks into exceptions, whatever the environment says
+enforce_query_budgets = override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True)
+
+
+@contextmanager
+def assert_query_budget(max_queries=None, n_plus_one=True):
+    """Fail if the block runs more than ``max_queries`` statements or repeats a statement shape."""
+    with QueryRecorder() as recorder:
+        yield recorder
+    problems = []
+    if max_queries is not None and recorder.count > max_queries:
+        problems.append(f'{recorder.count} queries (budget {max_queries})')
+    if n_plus_one:
+        for repeat in recorder.n_plus_one():
+            where = ', '.join(repeat['origins'])
+            problems.append(f"likely N+1: {repeat['count']}x {repeat['shape'][:200]} [{where}]")
+    if problems:
+        raise AssertionError('Query budget exceeded: ' + '; '.join(problems))
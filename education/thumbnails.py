@@ -0,0 +1,169 @@
+"""
+Resized WebP/JPEG derivatives for uploaded images.
+
+Derivatives are keyed by the SHA-1 of the source bytes and stored under
+MEDIA_ROOT/derivatives/<hh>/<hash>/<width>.<ext>, so identical uploads share
+one set of files. A small JSON index per source file name maps it to its hash
+and available widths; the ``responsive_image`` template tag reads it to build
+``srcset`` attributes. Encoding runs in a process pool off the request cycle.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+SIZES = (320, 640, 1280)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+QUALITY = 80
+DERIVATIVES_DIR = 'derivatives'
+INDEX_CACHE_PREFIX = 'thumbnails:index:'
+
+# (model label, field name) pairs that get derivatives
+IMAGE_FIELDS = [
+    ('education.VideoContent', 'thumbnail'),
+    ('education.Subject', 'thumbnail'),
+    ('education.UserProfile', 'profile_picture'),
+]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _index_path(media_root, name):
+    digest = hashlib.sha1(name.encode()).hexdigest()
+    return os.path.join(media_root, DERIVATIVES_DIR, 'index', f"{digest}.json")
+
+
+def index_cache_key(name):
+    return INDEX_CACHE_PREFIX + hashlib.sha1(name.encode()).hexdigest()
+
+
+def derivative_name(content_hash, width, ext):
+    return '/'.join([DERIVATIVES_DIR, content_hash[:2], content_hash, f"{width}.{ext}"])
+
+
+def build_derivatives(media_root, name, force=False):
+    """
+    Create the derivatives for MEDIA_ROOT/``name`` and write its index entry.
+    Runs inside pool processes, so it only touches the filesystem and Pillow.
+    """
+    from PIL import Image, ImageOps
+
+    source = os.path.join(media_root, name)
+    sha1 = hashlib.sha1()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(chunk)
+    content_hash = sha1.hexdigest()
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        # Never upscale; always produce at least one size
+        widths = [w for w in SIZES if w < image.width] or [image.width]
+        if image.width not in widths and image.width < SIZES[-1]:
+            widths.append(image.width)
+
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = None
+            for ext, (pil_format, _) in FORMATS.items():
+                target = os.path.join(media_root, derivative_name(content_hash, width, ext))
+                if os.path.exists(target) and not force:
+                    continue
+                if resized is None:
+                    resized = image.resize((width, height), Image.LANCZOS)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                output = resized.convert('RGB') if pil_format == 'JPEG' else resized
+                output.save(target, pil_format, quality=QUALITY, optimize=True)
+
+    entry = {'hash': content_hash, 'widths': sorted(widths)}
+    index_path = _index_path(media_root, name)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    with open(index_path, 'w') as f:
+        json.dump(entry, f)
+    return name, entry
+
+
+def get_derivatives(name):
+    """Return ``{'hash': ..., 'widths': [...]}`` for an image, or None if not built yet."""
+    if not name:
+        return None
+    key = index_cache_key(name)
+    entry = cache.get(key)
+    record_cache('thumbnails', entry is not None)
+    if entry is None:
+        try:
+            with open(_index_path(settings.MEDIA_ROOT, name)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            # Cache the miss briefly so templates do not stat() on every render
+            cache.set(key, False, 60)
+            return None
+        cache.set(key, entry, None)
+    return entry or None
+
+
+def srcset(name, ext):
+    entry = get_derivatives(name)
+    if not entry:
+        return ''
+    return ', '.join(
+        f"{settings.MEDIA_URL}{derivative_name(entry['hash'], width, ext)} {width}w"
+        for width in entry['widths']
+    )
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Workers are spawned, not forked, so they never inherit threads or DB connections
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _remember(future):
+    try:
+        name, entry = future.result()
+    except Exception:
+        logger.exception('Building image derivatives failed')
+        return
+    cache.set(index_cache_key(name), entry, None)
+
+
+def enqueue(name):
+    """Build derivatives for ``name`` in the process pool."""
+    future = _get_executor().submit(build_derivatives, settings.MEDIA_ROOT, name)
+    future.add_done_callback(_remember)
+    return future
+
+
+def queue_missing_derivatives(instance):
+    """Queue derivatives for any image field on ``instance`` that has none yet."""
+    if not settings.THUMBNAILS_ENABLED:
+        return
+    for label, field_name in IMAGE_FIELDS:
+        if instance._meta.label != label:
+            continue
+        image = getattr(instance, field_name)
+        if image and not get_derivatives(image.name):
+            transaction.on_commit(lambda name=image.name: enqueue(name))
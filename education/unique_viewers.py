@@ -0,0 +1,118 @@
+"""
+Unique-viewer estimates per video and per teacher, from HyperLogLog sketches.
+
+Every view event (signed-in user, anonymous session, or failing both the
+client IP) is added to that day's ViewerSketch for the video and for its
+teacher. The view_events writer thread folds each batch into the database
+with one read and one write per touched sketch; merging is a register-wise
+max, so it does not matter which gunicorn worker recorded which viewer.
+
+"Unique viewers this week/month" merges at most 30 small daily sketches,
+whatever the traffic, and the result is cached for UNIQUE_VIEWERS_CACHE_TIMEOUT.
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .hll import HyperLogLog
+from .models import VideoContent, ViewerSketch
+
+VIDEO = 'video'
+TEACHER = 'teacher'
+MERGE_ATTEMPTS = 3
+RETRY_DELAY = 0.1
+
+
+def viewer_key(user_id=None, session_key='', ip_address=None):
+    """What identifies a viewer, best first; None if nothing does."""
+    if user_id:
+        return f'u:{user_id}'
+    if session_key:
+        return f's:{session_key}'
+    if ip_address:
+        return f'ip:{ip_address}'
+    return None
+
+
+def record_viewers(events):
+    """Add ``(video_id, user_id, session_key, ip_address)`` events to today's sketches."""
+    teachers = dict(
+        VideoContent.objects.filter(id__in={event[0] for event in events}).values_list('id', 'teacher_id')
+    )
+    sketches = defaultdict(HyperLogLog)
+    for video_id, user_id, session_key, ip_address in events:
+        viewer = viewer_key(user_id, session_key, ip_address)
+        if viewer is None or video_id not in teachers:
+            continue
+        sketches[VIDEO, video_id].add(viewer)
+        sketches[TEACHER, teachers[video_id]].add(viewer)
+    if not sketches:
+        return
+
+    day = timezone.localdate()
+    for attempt in range(MERGE_ATTEMPTS):
+        try:
+            return _merge(sketches, day)
+        except (IntegrityError, OperationalError):
+            # Another worker created or is writing the same rows; merging again is safe
+            if attempt == MERGE_ATTEMPTS - 1:
+                raise
+            time.sleep(RETRY_DELAY * (attempt + 1))
+
+
+def _merge(sketches, day):
+    scopes = defaultdict(list)
+    for scope, object_id in sketches:
+        scopes[scope].append(object_id)
+    lookup = Q()
+    for scope, object_ids in scopes.items():
+        lookup |= Q(scope=scope, object_id__in=object_ids)
+
+    with transaction.atomic():
+        existing = {
+            (row.scope, row.object_id): row
+            for row in ViewerSketch.objects.select_for_update().filter(lookup, day=day)
+        }
+        changed, created = [], []
+        for key, sketch in sketches.items():
+            row = existing.get(key)
+            if row is None:
+                created.append(ViewerSketch(scope=key[0], object_id=key[1], day=day, registers=sketch.to_bytes()))
+                continue
+            merged = sketch.merge(HyperLogLog.from_bytes(row.registers)).to_bytes()
+            if merged != bytes(row.registers):
+                # bulk_update() does not apply auto_now
+                row.registers, row.updated_at = merged, timezone.now()
+                changed.append(row)
+        ViewerSketch.objects.bulk_update(changed, ['registers', 'updated_at'])
+        ViewerSketch.objects.bulk_create(created)
+
+
+def unique_viewers(scope, object_id, days):
+    """Estimated distinct viewers over the last ``days`` days, today included."""
+    today = timezone.localdate()
+    key = f'unique_viewers:{scope}:{object_id}:{days}:{today.isoformat()}'
+    count = cache.get(key)
+    if count is None:
+        merged = HyperLogLog()
+        rows = ViewerSketch.objects.filter(
+            scope=scope, object_id=object_id, day__gt=today - timedelta(days=days)
+        ).values_list('registers', flat=True)
+        for registers in rows:
+            merged.merge(HyperLogLog.from_bytes(registers))
+        count = merged.count()
+        cache.set(key, count, settings.UNIQUE_VIEWERS_CACHE_TIMEOUT)
+    return count
+
+
+def teacher_reach(teacher):
+    return {
+        'week': unique_viewers(TEACHER, teacher.pk, 7),
+        'month': unique_viewers(TEACHER, teacher.pk, 30),
+    }
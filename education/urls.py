@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
 from django.views.generic import TemplateView
@@ -6,10 +7,25 @@ from . import auth_views as custom_auth_views
 from .views import teacher_dashboard
 from .views import VideoDetailView, TeacherProfileView
 from .subject_views import SubjectListView, SubjectDetailView
+from .streaming import stream_hls, stream_video
+from .search_views import search
+
+# Under ASGI the hot read paths are served by their async implementations
+if settings.SERVER_MODE == 'asgi':
+    from . import async_views
+    homepage_view = async_views.homepage
+    video_detail_view = async_views.video_detail
+    subject_detail_view = async_views.subject_detail
+    toggle_save_video_view = async_views.toggle_save_video
+else:
+    homepage_view = views.homepage
+    video_detail_view = VideoDetailView.as_view()
+    subject_detail_view = SubjectDetailView.as_view()
+    toggle_save_video_view = views.toggle_save_video
 
 urlpatterns = [
     # Homepage
-    path('', views.homepage, name='home'),
+    path('', homepage_view, name='home'),
     
     # Authentication URLs
     path('signup/', custom_auth_views.signup_view, name='signup'),
@@ -63,11 +79,20 @@ urlpatterns = [
          name='password_change_done'),
          
     # Video and Teacher URLs
-    path('videos/<int:pk>/<slug:slug>/', VideoDetailView.as_view(), name='video_detail'),
+    path('videos/<int:pk>/stream/', stream_video, name='video_stream'),
+    path('videos/<int:pk>/hls/<path:name>', stream_hls, name='video_hls'),
+    path('videos/<int:pk>/<slug:slug>/', video_detail_view, name='video_detail'),
     path('teacher/<str:username>/', TeacherProfileView.as_view(), name='teacher_profile'),
-    path('api/toggle-save-video/<int:video_id>/', views.toggle_save_video, name='toggle_save_video'),
+    path('api/toggle-save-video/<int:video_id>/', toggle_save_video_view, name='toggle_save_video'),
+    path('api/saved-videos/', views.save_videos_batch, name='save_videos_batch'),
+    
+    # Read-only JSON catalog API
+    path('api/v1/', include('education.api_urls')),
+    
+    # Full-text search
+    path('search/', search, name='search'),
     
     # Subject listing
     path('subjects/', SubjectListView.as_view(), name='subject_list'),
-    path('subjects/<slug:slug>/', SubjectDetailView.as_view(), name='subject_detail'),
+    path('subjects/<slug:slug>/', subject_detail_view, name='subject_detail'),
 ]
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""
+Background HLS packaging for uploaded videos.
+
+Each upload is transcoded by a local ffmpeg into a few fixed renditions and a
+master playlist stored under ``hls_output_path``. Jobs run on a small thread
+pool (ffmpeg does the heavy lifting in its own process), so the request that
+saved the video never waits, and at most VIDEO_PROCESSING_WORKERS encodes run
+per web worker. ``python manage.py process_videos`` runs the same pipeline
+outside the web processes.
+
+A row stays 'processing' for good if its worker dies mid-encode (restart,
+OOM kill). Claims stamp updated_at, and a 'processing' row older than
+twice VIDEO_PROCESSING_TIMEOUT, which no live ffmpeg run can reach, may be
+claimed again.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import VideoContent, hls_output_path
+
+logger = logging.getLogger(__name__)
+
+# name, height, video bitrate, audio bitrate
+RENDITIONS = [
+    ('240p', 240, '400k', '64k'),
+    ('480p', 480, '1000k', '96k'),
+    ('720p', 720, '2500k', '128k'),
+]
+SEGMENT_SECONDS = 6
+MASTER_PLAYLIST = 'master.m3u8'
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_flight = set()
+
+
+def claimable(statuses=('pending', 'failed')):
+    """Rows in ``statuses``, plus 'processing' rows whose worker has evidently died."""
+    stale = timezone.now() - timedelta(seconds=settings.VIDEO_PROCESSING_TIMEOUT * 2)
+    return Q(processing_status__in=statuses) | Q(processing_status='processing', updated_at__lt=stale)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.VIDEO_PROCESSING_WORKERS,
+                thread_name_prefix='video-processing',
+            )
+        return _executor
+
+
+def enqueue(video_id):
+    """Schedule packaging of ``video_id`` unless it is already queued here."""
+    if not settings.VIDEO_PROCESSING_ENABLED:
+        return
+    if shutil.which(settings.FFMPEG_BINARY) is None:
+        # Leave the row pending for `manage.py process_videos` on a host that has ffmpeg
+        logger.warning('ffmpeg not found; video %s left pending', video_id)
+        return
+    with _executor_lock:
+        if video_id in _in_flight:
+            return
+        _in_flight.add(video_id)
+    _get_executor().submit(_run_job, video_id)
+
+
+def _run_job(video_id):
+    try:
+        process_video(video_id)
+    except Exception:
+        logger.exception('HLS packaging failed for video %s', video_id)
+    finally:
+        with _executor_lock:
+            _in_flight.discard(video_id)
+        # The file may have been replaced while we were encoding
+        if VideoContent.objects.filter(id=video_id, processing_status='pending').exists():
+            enqueue(video_id)
+        # Worker threads hold their own DB connections
+        close_old_connections()
+
+
+def has_audio(path):
+    probe = [
+        settings.FFPROBE_BINARY, '-v', 'error', '-select_streams', 'a',
+        '-show_entries', 'stream=index', '-of', 'csv=p=0', path,
+    ]
+    result = subprocess.run(probe, capture_output=True, text=True, check=True)
+    return bool(result.stdout.strip())
+
+
+def build_ffmpeg_command(source, output_dir, audio=True):
+    """Single ffmpeg pass producing every rendition plus the master playlist."""
+    count = len(RENDITIONS)
+    split = f"[0:v]split={count}" + ''.join(f"[v{i}]" for i in range(count))
+    scales = [f"[v{i}]scale=-2:{height}[v{i}out]" for i, (_, height, _, _) in enumerate(RENDITIONS)]
+
+    command = [
+        settings.FFMPEG_BINARY, '-y', '-v', 'error', '-i', source,
+        '-filter_complex', ';'.join([split] + scales),
+    ]
+    stream_map = []
+    for i, (name, _, video_bitrate, audio_bitrate) in enumerate(RENDITIONS):
+        command += [
+            '-map', f'[v{i}out]',
+            f'-c:v:{i}', 'libx264', f'-b:v:{i}', video_bitrate,
+            f'-maxrate:v:{i}', video_bitrate, f'-bufsize:v:{i}', video_bitrate,
+        ]
+        if audio:
+            command += ['-map', 'a:0', f'-c:a:{i}', 'aac', f'-b:a:{i}', audio_bitrate, '-ac', '2']
+            stream_map.append(f'v:{i},a:{i},name:{name}')
+        else:
+            stream_map.append(f'v:{i},name:{name}')
+
+    command += [
+        # Keyframes on the segment boundaries whatever the frame rate, so every
+        # rendition cuts segments at the same timestamps
+        '-preset', 'veryfast', '-sc_threshold', '0',
+        '-force_key_frames', f'expr:gte(t,n_forced*{SEGMENT_SECONDS})',
+        '-f', 'hls',
+        '-hls_time', str(SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', os.path.join(output_dir, '%v', 'segment_%03d.ts'),
+        '-master_pl_name', MASTER_PLAYLIST,
+        '-var_stream_map', ' '.join(stream_map),
+        os.path.join(output_dir, '%v', 'index.m3u8'),
+    ]
+    return command
+
+
+def process_video(video_id):
+    """Transcode one video synchronously and record the outcome on the row."""
+    # Claim the row; another worker may already be on it
+    # update() skips auto_now, so stamp updated_at for the stale check
+    claimed = VideoContent.objects.filter(claimable(), id=video_id).update(
+        processing_status='processing', updated_at=timezone.now(),
+    )
+    if not claimed:
+        return False
+
+    video = VideoContent.objects.get(id=video_id)
+    relative_dir = hls_output_path(video)
+    output_dir = default_storage.path(relative_dir)
+    try:
+        source = video.video_file.path
+        if os.path.isdir(output_dir):
+            shutil.rmtree(output_dir)
+        for name, _, _, _ in RENDITIONS:
+            os.makedirs(os.path.join(output_dir, name), exist_ok=True)
+
+        command = build_ffmpeg_command(source, output_dir, audio=has_audio(source))
+        subprocess.run(
+            command, check=True, capture_output=True,
+            timeout=settings.VIDEO_PROCESSING_TIMEOUT,
+        )
+    except (OSError, ValueError, subprocess.SubprocessError) as exc:
+        stderr = getattr(exc, 'stderr', None) or ''
+        if isinstance(stderr, bytes):
+            stderr = stderr.decode(errors='replace')
+        logger.error('ffmpeg failed for video %s: %s %s', video_id, exc, stderr[-2000:])
+        VideoContent.objects.filter(id=video_id, video_file=video.video_file.name).update(
+            processing_status='failed', hls_manifest='',
+        )
+        return False
+
+    # Only publish the manifest if the file was not replaced while we worked
+    VideoContent.objects.filter(id=video_id, video_file=video.video_file.name).update(
+        processing_status='ready',
+        hls_manifest=os.path.join(relative_dir, MASTER_PLAYLIST).replace(os.sep, '/'),
+    )
+    return True
@@ -0,0 +1,141 @@
+"""
+Write-behind buffer for VideoContent.view_count.
+
+Page views only bump a per-video row in PendingViewCount with a single
+``INSERT ... ON CONFLICT DO UPDATE SET pending = pending + 1`` upsert, which
+the database applies atomically whatever the number of workers or hosts,
+and which never touches the hot VideoContent row (or anything keyed on its
+updates). Pending views are folded into view_count in batched
+UPDATEs every VIEW_COUNT_FLUSH_INTERVAL seconds, or on demand through the
+``flush_view_counts`` management command, which start.sh runs on boot to pick
+up views left behind by killed workers.
+
+A flush deletes the pending rows with DELETE ... RETURNING and adds what it
+got back in the same transaction: a view recorded meanwhile starts a new row
+instead of being lost or counted twice, and a failed UPDATE rolls the
+DELETE back.
+"""
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, When, Value
+
+FLUSH_BATCH_SIZE = 500
+
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+_flushing = False
+
+
+def _table():
+    from .models import PendingViewCount
+
+    return connection.ops.quote_name(PendingViewCount._meta.db_table)
+
+
+def record_view(video_id):
+    """
+    Buffer a single view of ``video_id`` and flush in the background when
+    due. Returns the number of views now pending for the video.
+    """
+    table = _table()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (video_id, pending) VALUES (%s, 1) "
+                f"ON CONFLICT (video_id) DO UPDATE SET pending = {table}.pending + 1 RETURNING pending",
+                [video_id],
+            )
+            pending = cursor.fetchone()[0]
+    except IntegrityError:
+        # The video was deleted meanwhile
+        pending = 0
+    _maybe_flush()
+    return pending
+
+
+def pending_views(video_id):
+    """Return the number of buffered views not yet written to the database."""
+    from .models import PendingViewCount
+
+    return PendingViewCount.objects.filter(video_id=video_id).values_list('pending', flat=True).first() or 0
+
+
+def live_view_count(video, pending=None):
+    """
+    Approximate current count: the stored value plus anything still buffered.
+    Pass what record_view() returned as ``pending`` to save a query.
+    """
+    if pending is None:
+        pending = pending_views(video.pk)
+    return video.view_count + pending
+
+
+def _maybe_flush():
+    global _flushing
+    interval = getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 30)
+    with _lock:
+        if _flushing or time.monotonic() - _last_flush < interval:
+            return
+        _flushing = True
+    # Never make the request wait on the write
+    threading.Thread(target=_flush_in_background, daemon=True).start()
+
+
+def _flush_in_background():
+    global _flushing
+    try:
+        flush()
+    finally:
+        # This thread's connection would otherwise stay open for good
+        connection.close()
+        with _lock:
+            _flushing = False
+
+
+def _take_pending(limit):
+    """Delete up to ``limit`` pending rows and return them as ``{video_id: views}``."""
+    table = _table()
+    with connection.cursor() as cursor:
+        # One statement, so nothing can increment a row between reading and removing it
+        cursor.execute(
+            f"DELETE FROM {table} WHERE video_id IN (SELECT video_id FROM {table} LIMIT %s) "
+            f"RETURNING video_id, pending",
+            [limit],
+        )
+        return dict(cursor.fetchall())
+
+
+def flush():
+    """Write all buffered views, from every worker, to the database. Returns the number of views flushed."""
+    global _last_flush
+    from .models import VideoContent
+
+    with _lock:
+        _last_flush = time.monotonic()
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            increments = _take_pending(FLUSH_BATCH_SIZE)
+            if not increments:
+                return total
+            VideoContent.objects.filter(id__in=increments).update(
+                view_count=F('view_count') + Case(
+                    *[When(id=video_id, then=Value(count)) for video_id, count in increments.items()],
+                    default=Value(0),
+                )
+            )
+        total += sum(increments.values())
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        flush()
+    except Exception:
+        # The interpreter is shutting down; nothing useful left to do
+        pass
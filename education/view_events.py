@@ -0,0 +1,210 @@
+"""
+Write-behind ingestion of VideoView rows.
+
+Video pages no longer write to the database to record a view. ``record()``
+puts the event on a bounded in-process queue, and a background writer thread
+drains it with bulk_create() in batches of VIEW_EVENT_BATCH_SIZE, at least
+every VIEW_EVENT_FLUSH_INTERVAL seconds.
+
+"One row per user per video" is enforced by the unique_video_view_per_user
+constraint, and the inserts ignore conflicts, so repeat views cost nothing.
+Anonymous views are kept once per video per day for each session (or,
+without one, each IP address), checked with one query per batch; two
+workers writing the same viewer at the same moment may still both insert.
+Every event, kept or not, is added to the HyperLogLog unique-viewer
+sketches (see unique_viewers.py), and the writer keeps the daily rollups
+current (rollups.build_if_due()).
+
+When the queue is full, ``record()`` waits up to VIEW_EVENT_BLOCK_TIMEOUT
+for room (backpressure on the request), then drops the event. Queue depth,
+written rows and dropped events are exported through education/metrics.py
+and ``stats()``. Pending events are written when the process exits.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from . import rollups, unique_viewers
+from .metrics import VIEW_EVENTS_DROPPED, VIEW_EVENTS_ENQUEUED, VIEW_EVENTS_QUEUED, VIEW_EVENTS_WRITTEN
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_queue = None
+_writer = None
+_pid = None
+_stats = Counter()
+
+
+def _ensure_writer():
+    """Return this process's queue, starting the writer thread on first use (and after a fork)."""
+    global _queue, _writer, _pid
+    with _lock:
+        if _pid != os.getpid():
+            _queue = queue.Queue(maxsize=settings.VIEW_EVENT_QUEUE_SIZE)
+            _writer = threading.Thread(target=_run_writer, args=(_queue,), name='view-events', daemon=True)
+            _writer.start()
+            _pid = os.getpid()
+            _stats.clear()
+        return _queue
+
+
+def record(video_id, user_id=None, session_key='', ip_address=None):
+    """Queue one view; returns False if it had to be dropped."""
+    if not settings.VIEW_EVENTS_ASYNC:
+        write_batch([(video_id, user_id, session_key or '', ip_address)])
+        return True
+
+    events = _ensure_writer()
+    try:
+        events.put((video_id, user_id, session_key or '', ip_address), timeout=settings.VIEW_EVENT_BLOCK_TIMEOUT)
+    except queue.Full:
+        _count('dropped_full')
+        VIEW_EVENTS_DROPPED.labels('queue_full').inc()
+        return False
+    _count('enqueued')
+    VIEW_EVENTS_ENQUEUED.inc()
+    VIEW_EVENTS_QUEUED.inc()
+    return True
+
+
+def _count(name, amount=1):
+    with _lock:
+        _stats[name] += amount
+
+
+def _anonymous_key(video_id, session_key, ip_address):
+    return (video_id, session_key) if session_key else (video_id, None, ip_address)
+
+
+def _repeat_anonymous_views(events):
+    """Keys of anonymous events whose viewer already has a row for the video today."""
+    from .models import VideoView
+
+    anonymous = [event for event in events if not event[1] and (event[2] or event[3])]
+    if not anonymous:
+        return set()
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = VideoView.objects.filter(
+        Q(session_key__in={event[2] for event in anonymous if event[2]})
+        | Q(session_key='', ip_address__in={event[3] for event in anonymous if not event[2]}),
+        user__isnull=True, created_at__gte=today, video_id__in={event[0] for event in anonymous},
+    ).values_list('video_id', 'session_key', 'ip_address')
+    return {_anonymous_key(*row) for row in rows}
+
+
+def write_batch(events):
+    """
+    Insert ``events`` as VideoView rows, skipping (user, video) pairs that
+    already exist and anonymous viewers already recorded for the video today.
+    Returns the number of rows passed to the database.
+    """
+    from .models import VideoView
+
+    seen = _repeat_anonymous_views(events)
+    rows = []
+    for video_id, user_id, session_key, ip_address in events:
+        if not user_id and (session_key or ip_address):
+            key = _anonymous_key(video_id, session_key, ip_address)
+            if key in seen:
+                continue
+            seen.add(key)
+        rows.append(VideoView(video_id=video_id, user_id=user_id, session_key=session_key, ip_address=ip_address))
+    VideoView.objects.bulk_create(rows, ignore_conflicts=True)
+    try:
+        unique_viewers.record_viewers(events)
+    except DatabaseError:
+        # The rows are stored; only the reach estimates miss this batch
+        logger.exception('Could not update unique-viewer sketches for %d view event(s)', len(events))
+    return len(rows)
+
+
+def _drain(events, first, limit):
+    # Stops early at the shutdown sentinel (None)
+    batch = [first]
+    while len(batch) < limit and batch[-1] is not None:
+        try:
+            batch.append(events.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _write(batch):
+    try:
+        write_batch(batch)
+    except Exception:
+        logger.exception('Dropping %d view event(s) after a failed write', len(batch))
+        _count('dropped_error', len(batch))
+        VIEW_EVENTS_DROPPED.labels('write_error').inc(len(batch))
+    else:
+        _count('written', len(batch))
+        VIEW_EVENTS_WRITTEN.inc(len(batch))
+        try:
+            rollups.build_if_due()
+        except Exception:
+            logger.exception('Could not update the daily view rollups')
+    finally:
+        VIEW_EVENTS_QUEUED.dec(len(batch))
+        close_old_connections()
+
+
+def _run_writer(events):
+    while True:
+        try:
+            first = events.get(timeout=settings.VIEW_EVENT_FLUSH_INTERVAL)
+        except queue.Empty:
+            continue
+        if first is None:
+            events.task_done()
+            return
+        batch = _drain(events, first, settings.VIEW_EVENT_BATCH_SIZE)
+        stop = batch[-1] is None
+        if stop:
+            batch.pop()
+        _write(batch)
+        for _ in range(len(batch) + stop):
+            events.task_done()
+        if stop:
+            return
+
+
+def flush():
+    """Block until every event queued so far in this process has been written."""
+    if _pid == os.getpid() and _queue is not None:
+        _queue.join()
+
+
+def stats():
+    with _lock:
+        depth = _queue.qsize() if _pid == os.getpid() and _queue is not None else 0
+        return {
+            'queue_depth': depth,
+            'enqueued': _stats['enqueued'],
+            'written': _stats['written'],
+            'dropped_full': _stats['dropped_full'],
+            'dropped_error': _stats['dropped_error'],
+        }
+
+
+@atexit.register
+def shutdown():
+    """Stop the writer after it has written everything still queued."""
+    global _pid
+    if _pid != os.getpid() or _queue is None:
+        return
+    try:
+        _queue.put(None, timeout=settings.VIEW_EVENT_SHUTDOWN_TIMEOUT)
+    except queue.Full:
+        logger.error('View event writer is stuck; %d event(s) lost', _queue.qsize())
+        return
+    _writer.join(settings.VIEW_EVENT_SHUTDOWN_TIMEOUT)
+    _pid = None
@@ -5,39 +5,25 @@ from django.contrib import messages
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.decorators import login_required
 from django.views.generic import ListView, DetailView
-from django.db.models import Count, Q, F
+from django.db.models import Count, Q, F, Sum
 from django.utils import timezone
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import Http404, JsonResponse
 from django.views.decorators.http import require_POST
 import json
 
 from .forms import UserRegistrationForm, ProfileUpdateForm, VideoUploadForm, NoteForm
 from .models import UserProfile, VideoContent, Note, Subject, VideoView
+from . import homepage_cache, rollups, saved_sets, unique_viewers, view_counter, view_events
+from .pagination import paginate, video_sort
+from .profiles import get_profile
+from .recommendations import recommended_videos_for
+from .related_videos import related_videos_for
 
 def homepage(request):
-    # Get featured subjects
-    featured_subjects = Subject.objects.annotate(
-        video_count=Count('videos', filter=Q(videos__is_published=True))
-    ).order_by('-video_count')[:6]
-    
-    # Get latest videos
-    latest_videos = VideoContent.objects.filter(
-        is_published=True
-    ).select_related('teacher', 'subject').order_by('-created_at')[:8]
-    
-    # Get popular teachers (teachers with most videos)
-    popular_teachers = UserProfile.objects.filter(
-        role='teacher',
-        is_approved=True
-    ).annotate(
-        video_count=Count('user__videos', filter=Q(user__videos__is_published=True))
-    ).filter(video_count__gt=0).order_by('-video_count')[:4]
-    
-    context = {
-        'featured_subjects': featured_subjects,
-        'latest_videos': latest_videos,
-        'popular_teachers': popular_teachers,
-    }
+    # Featured subjects, latest videos and popular teachers are cached and
+    # invalidated by model signals, see homepage_cache.py
+    context = homepage_cache.get_homepage_data()
     return render(request, 'education/homepage.html', context)
 
 
@@ -123,28 +109,16 @@ def teacher_dashboard(request):
 
 @login_required
 def student_dashboard(request):
-    if not hasattr(request.user, 'userprofile') or request.user.userprofile.role != 'student':
+    user_profile = get_profile(request)
+    if user_profile is None or user_profile.role != 'student':
         messages.warning(request, 'You do not have permission to access this page.')
         return redirect('home')
     
     # Get user's enrolled subjects
-    user_profile = request.user.userprofile
     enrolled_subjects = user_profile.subjects.all()
     
-    # Get recommended videos (from enrolled subjects or popular ones)
-    recommended_videos = VideoContent.objects.filter(
-        is_published=True,
-        subject__in=enrolled_subjects
-    ).select_related('teacher', 'subject').order_by('-view_count')[:6]
-    
-    # If not enough recommended videos, get some popular ones
-    if recommended_videos.count() < 6:
-        additional = VideoContent.objects.filter(
-            is_published=True
-        ).exclude(id__in=[v.id for v in recommended_videos])\
-            .select_related('teacher', 'subject')\
-            .order_by('-view_count')[:6 - recommended_videos.count()]
-        recommended_videos = list(recommended_videos) + list(additional)
+    # Get recommended videos (precomputed, popular in enrolled subjects for new students)
+    recommended_videos = recommended_videos_for(request.user, 6)
     
     # Get recently viewed videos
     recently_viewed = VideoView.objects.filter(
@@ -167,12 +141,11 @@ def student_dashboard(request):
 
 @login_required
 def teacher_dashboard(request):
-    if not hasattr(request.user, 'userprofile') or request.user.userprofile.role != 'teacher':
+    teacher_profile = get_profile(request)
+    if teacher_profile is None or teacher_profile.role != 'teacher':
         messages.warning(request, 'You do not have permission to access this page.')
         return redirect('home')
     
-    teacher_profile = request.user.userprofile
-    
     # Get teacher's videos with counts
     videos = VideoContent.objects.filter(
         teacher=request.user
@@ -185,49 +158,36 @@ def teacher_dashboard(request):
     ).select_related('subject', 'video').order_by('-created_at')
     note_count = notes.count()
     
-    # Get recent students (last 5)
+    # Get recent students (last 5 who watched one of the teacher's videos)
     recent_students = User.objects.filter(
-        profile__enrolled_courses__teacher=request.user
+        videoview__video__teacher=request.user, profile__role='student'
     ).distinct().order_by('-date_joined')[:5]
     
-    # Get recent enrollments
-    recent_enrollments = Enrollment.objects.filter(
-        course__teacher=request.user
-    ).select_related('student', 'course').order_by('-enrolled_at')[:5]
+    # View analytics come from the daily rollups, see rollups.py
+    view_totals = rollups.teacher_totals(request.user)
+    recent_videos = list(videos[:5])
+    video_views = rollups.video_totals([video.id for video in recent_videos])
+    for video in recent_videos:
+        video.total_views = video_views.get(video.id, 0)
     
-    # Get video views analytics
-    video_views = VideoView.objects.filter(
-        video__teacher=request.user
-    ).count()
+    # Get recent student activity (anonymous views have no one to show)
+    recent_views = VideoView.objects.filter(
+        video__teacher=request.user, user__isnull=False
+    ).select_related('user', 'video').order_by('-created_at')[:5]
     
     context = {
         'teacher': request.user,
-        'profile': teacher_profile,
-        'videos': videos[:5],  # Show only recent 5 videos
+        'teacher_profile': teacher_profile,
+        'videos': recent_videos,  # Show only recent 5 videos
         'video_count': video_count,
         'notes': notes[:5],    # Show only recent 5 notes
         'note_count': note_count,
         'recent_students': recent_students,
-        'recent_enrollments': recent_enrollments,
-        'total_views': video_views,
-    }
-    
-    # Get video statistics
-    total_views = sum(video.view_count for video in videos)
-    total_videos = videos.count()
-    
-    # Get recent student activity
-    recent_views = VideoView.objects.filter(
-        video__teacher=request.user
-    ).select_related('user', 'video').order_by('-created_at')[:5]
-    
-    context = {
-        'teacher_profile': teacher_profile,
-        'videos': videos[:5],  # Show only recent 5 videos
-        'notes': notes[:5],    # Show only recent 5 notes
-        'total_views': total_views,
-        'total_videos': total_videos,
+        'total_views': view_totals['views'],
         'recent_views': recent_views,
+        'views_by_day': rollups.teacher_daily_series(request.user, 30),
+        # HyperLogLog estimates, see unique_viewers.py
+        'unique_viewers': unique_viewers.teacher_reach(request.user),
     }
     return render(request, 'education/teacher/dashboard.html', context)
 
@@ -240,43 +200,45 @@ class VideoDetailView(DetailView):
     def get_queryset(self):
         # Only show published videos to non-owners
         queryset = VideoContent.objects.select_related('teacher', 'subject')
-        if not self.request.user.is_authenticated or self.request.user != self.get_object().teacher:
-            queryset = queryset.filter(is_published=True)
-        return queryset
+        if self.request.user.is_authenticated:
+            return queryset.filter(Q(is_published=True) | Q(teacher=self.request.user))
+        return queryset.filter(is_published=True)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        video = self.get_object()
+        video = self.object
         
-        # Track view if user is authenticated
+        # Queued and written in batches; repeat views by a user are ignored by the
+        # database, anonymous ones are kept once per session (or IP) per day.
+        pending = None
         if self.request.user.is_authenticated:
-            VideoView.objects.get_or_create(
-                video=video,
-                user=self.request.user,
-                defaults={'ip_address': self.get_client_ip()}
+            view_events.record(video.id, self.request.user.id, ip_address=self.get_client_ip())
+            # Buffered; the count is written to the database in batches
+            pending = view_counter.record_view(video.id)
+        else:
+            view_events.record(
+                video.id, session_key=self.request.session.session_key or '', ip_address=self.get_client_ip()
             )
-            video.view_count = F('view_count') + 1
-            video.save(update_fields=['view_count'])
-            video.refresh_from_db()
+        video.view_count = view_counter.live_view_count(video, pending)
         
-        # Get related videos (same subject)
-        related_videos = VideoContent.objects.filter(
-            subject=video.subject,
-            is_published=True
-        ).exclude(id=video.id).select_related('teacher')[:4]
+        # Get related videos (precomputed from co-views)
+        related_videos = related_videos_for(video, 4)
         
         # Get video notes
         notes = video.video_notes.filter(is_public=True)
         
-        # Check if video is saved by user
-        is_saved = False
-        if self.request.user.is_authenticated:
-            is_saved = self.request.user.userprofile.saved_videos.filter(id=video.id).exists()
+        # Saved badges for this video and the related cards, from the cached saved set.
+        # The profile is loaded once here and reused by the context processor.
+        get_profile(self.request)
+        saved_video_ids = saved_sets.saved_among(
+            self.request.user, [video.id] + [related.id for related in related_videos]
+        )
         
         context.update({
             'related_videos': related_videos,
             'notes': notes,
-            'is_saved': is_saved,
+            'is_saved': video.id in saved_video_ids,
+            'saved_video_ids': saved_video_ids,
         })
         return context
     
@@ -297,19 +259,22 @@ class TeacherProfileView(DetailView):
     slug_url_kwarg = 'username'
     
     def get_queryset(self):
-        return User.objects.filter(userprofile__role='teacher', userprofile__is_approved=True)
+        return User.objects.filter(profile__role='teacher', profile__is_approved=True).select_related('profile')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        teacher = self.get_object()
+        teacher = self.object
         
         # Get teacher's profile
-        teacher_profile = teacher.userprofile
+        teacher_profile = teacher.profile
         
-        # Get teacher's videos (published only for non-owners)
+        # Get teacher's videos (published only for non-owners), one page at a time
         videos = teacher.videos.all()
-        if not self.request.user.is_authenticated or self.request.user != teacher:
+        is_owner = self.request.user.is_authenticated and self.request.user == teacher
+        if not is_owner:
             videos = videos.filter(is_published=True)
+        sort, ordering = video_sort(self.request)
+        videos = paginate(self.request, videos.select_related('subject'), 8, ordering)
         
         # Get teacher's subjects (from their videos)
         subjects = Subject.objects.filter(
@@ -325,11 +290,15 @@ class TeacherProfileView(DetailView):
         
         context.update({
             'teacher_profile': teacher_profile,
-            'videos': videos.order_by('-created_at')[:8],
+            'videos': videos,
+            'sort': sort,
+            # Saved badges for the whole page from one cached set
+            'saved_video_ids': saved_sets.saved_among(self.request.user, [video.id for video in videos]),
             'subjects': subjects,
             'notes': notes,
             'total_views': total_views,
-            'total_videos': videos.count(),
+            # Owners also see their drafts; visitors get the denormalized count
+            'total_videos': teacher.videos.count() if is_owner else teacher_profile.published_video_count,
             'total_notes': notes.count(),
         })
         return context
@@ -338,22 +307,47 @@ class TeacherProfileView(DetailView):
 @login_required
 @require_POST
 def toggle_save_video(request, video_id):
-    video = get_object_or_404(VideoContent, id=video_id, is_published=True)
-    user_profile = request.user.userprofile
-    
-    if user_profile.saved_videos.filter(id=video_id).exists():
-        user_profile.saved_videos.remove(video)
-        saved = False
-    else:
-        user_profile.saved_videos.add(video)
-        saved = True
-    
+    # A DELETE, plus an INSERT when nothing was deleted; see saved_sets.py
+    saved = saved_sets.toggle_video(request.user, video_id, saved_sets.requested_state(request))
+    if saved is None:
+        raise Http404('No video found matching the query')
     return JsonResponse({'saved': saved})
 
+
+def _batch_ids(request):
+    """``(save, unsave)`` id lists from a JSON body or repeated form fields."""
+    if request.content_type == 'application/json':
+        data = json.loads(request.body or b'{}')
+        lists = [data.get('save', []), data.get('unsave', [])]
+    else:
+        lists = [request.POST.getlist('save'), request.POST.getlist('unsave')]
+    if not all(isinstance(values, list) for values in lists):
+        raise ValueError('Expected lists of ids')
+    return [[int(value) for value in values] for values in lists]
+
+
+@login_required
+@require_POST
+def save_videos_batch(request):
+    """Save and unsave several videos at once: ``{"save": [ids], "unsave": [ids]}``."""
+    try:
+        save, unsave = _batch_ids(request)
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'save and unsave must be lists of video ids'}, status=400)
+    if len(save) + len(unsave) > settings.SAVED_VIDEOS_BATCH_LIMIT:
+        return JsonResponse({'error': f'At most {settings.SAVED_VIDEOS_BATCH_LIMIT} ids per request'}, status=400)
+    
+    result = saved_sets.save_videos(request.user, save, unsave)
+    if result is None:
+        raise Http404('No profile for this user')
+    saved, unsaved = result
+    return JsonResponse({'saved': saved, 'unsaved': unsaved})
+
 @login_required
 def student_dashboard(request):
-    if request.user.userprofile.role != 'student':
-        return redirect('homepage')
+    user_profile = get_profile(request)
+    if user_profile is None or user_profile.role != 'student':
+        return redirect('home')
     
     # Get user's watched videos count (you'll need to implement this logic)
     videos_watched = request.user.watched_videos.count() if hasattr(request.user, 'watched_videos') else 0
@@ -393,8 +387,8 @@ def student_dashboard(request):
         }
     ]
     
-    # Get recommended videos (you might want to implement a recommendation system)
-    recommended_videos = VideoContent.objects.order_by('-created_at')[:4]
+    # Get recommended videos (precomputed by `manage.py build_recommendations`)
+    recommended_videos = recommended_videos_for(request.user, 4)
     
     context = {
         'stats': {
@@ -0,0 +1,21 @@
+# Loaded automatically by gunicorn from the working directory (see start.sh)
+import os
+import sys
+
+
+def child_exit(server, worker):
+    # Let prometheus_client clean up the files of workers that exited
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def pre_fork(server, worker):
+    # With --preload the master may have opened a database connection; workers
+    # must not inherit it (persistent connections would keep using it)
+    from django.db import connections
+    connections.close_all()
+    # Nor a PostgreSQL pool's sockets (workers create their own pools)
+    pooled = sys.modules.get('education.db_backends.postgresql.base')
+    if pooled is not None:
+        pooled.close_pools()
@@ -6,6 +6,9 @@ set -ex
 mkdir -p staticfiles media
 chmod -R 755 staticfiles media
 
+# Number of gunicorn workers
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-2}
+
 # Install dependencies
 echo "=== Installing dependencies ==="
 pip install -r requirements.txt
@@ -14,6 +17,12 @@ pip install -r requirements.txt
 echo "=== Applying database migrations ==="
 python manage.py migrate --noinput
 
+# Write view counts still buffered by the previous run's workers
+python manage.py flush_view_counts
+
+# Catch the daily view rollups up; the workers keep them current from here on
+python manage.py build_view_rollups
+
 # Create superuser if no users exist
 echo "=== Checking for superuser ==="
 if ! python manage.py shell -c "from django.contrib.auth import get_user_model; User = get_user_model(); exit(0 if User.objects.exists() else 1)"; then
@@ -30,12 +39,27 @@ fi
 echo "=== Collecting static files ==="
 python manage.py collectstatic --noinput --clear
 
-# Start Gunicorn with detailed logging
-echo "=== Starting Gunicorn ==="
-exec gunicorn edtech_project.wsgi:application \
+# Start Gunicorn with detailed logging; SERVER_MODE=asgi swaps the sync
+# workers for uvicorn ones serving edtech_project.asgi
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    APP_MODULE=edtech_project.asgi:application
+    WORKER_CLASS=uvicorn.workers.UvicornWorker
+else
+    APP_MODULE=edtech_project.wsgi:application
+    WORKER_CLASS=sync
+fi
+
+# Workers share Prometheus metrics through files in this directory; start
+# each deploy from an empty one (see education/metrics.py)
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus-multiproc}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+echo "=== Starting Gunicorn (${SERVER_MODE:-wsgi}) ==="
+exec gunicorn "$APP_MODULE" \
     --bind 0.0.0.0:${PORT:-10000} \
-    --workers 2 \
-    --worker-class=sync \
+    --workers $WEB_CONCURRENCY \
+    --worker-class="$WORKER_CLASS" \
     --log-level=debug \
     --access-logfile - \
     --error-logfile - \